@@ -14,6 +14,16 @@
     This pattern involves a single class which provides simplified methods required by client and delegates calls to methods of existing system classes. 
 
 """
+import csv
+import math
+from bisect import bisect_right
+from enum import IntEnum
+from itertools import islice
+from typing import Iterator, Tuple
+
+import numpy as np
+
+
 class BMIParams:
 
     def __init__(self, height, weight) -> None:
@@ -26,20 +36,58 @@ class BMICalculator:
     def get_bmi_index(params: BMIParams):
         bmi = params.weight/(params.height*params.height)
         return bmi
-    
+
+    @staticmethod
+    def get_bmi_indexes(heights, weights) -> np.ndarray:
+        """
+        Vectorized variant of get_bmi_index, heights and weights can be numpy arrays or any array-like columns.
+        """
+        heights = np.asarray(heights, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        return weights / (heights * heights)
+
+
+class BMICategory(IntEnum):
+    UNDERWEIGHT = 0
+    NORMAL = 1
+    OVERWEIGHT = 2
+    OBESE = 3
+
+
+class BMIResult:
+    """
+    Holds the bmi value and its category, the text is rendered only when the result is printed.
+    """
+    __slots__ = ('bmi', 'category')
+
+    def __init__(self, bmi: float, category: BMICategory) -> None:
+        self.bmi = bmi
+        self.category = category
+
+    def __str__(self) -> str:
+        return f'Your BMI is {round(self.bmi, 0)} - {self.category.name.lower()}'
+
+
 class BMIResultEvaluator:
+    # Upper bounds of underweight, normal and overweight - underweight includes 18.5, overweight starts at 25 and obese at 30.
+    _BOUNDARIES = (math.nextafter(18.5, math.inf), 25.0, 30.0)
+    _BOUNDARIES_ARRAY = np.array(_BOUNDARIES)
+    _CATEGORIES = tuple(BMICategory)
+
     @staticmethod
-    def evaluate(bmi):
-        if bmi <= 18.5:
-            return f'Your BMI is {round(bmi, 0)} - underweight'
-        elif 18.5 < bmi < 25:
-            return f'Your BMI is {round(bmi, 0)} -  normal'
+    def classify(bmi: float) -> BMICategory:
+        return BMIResultEvaluator._CATEGORIES[bisect_right(BMIResultEvaluator._BOUNDARIES, bmi)]
 
-        elif 25 < bmi < 30:
-            return f'your BMI is {round(bmi, 0)} - overweight'
+    @staticmethod
+    def evaluate(bmi) -> BMIResult:
+        return BMIResult(bmi, BMIResultEvaluator.classify(bmi))
 
-        elif bmi > 30:
-          return f'Your BMI is  {round(bmi, 0)} - obese'
+    @staticmethod
+    def categorize(bmis: np.ndarray) -> np.ndarray:
+        """
+        Returns a BMICategory code per bmi value.
+        """
+        return np.searchsorted(BMIResultEvaluator._BOUNDARIES_ARRAY, bmis, side='right').astype(np.int8)
 
 class BMI:
     @staticmethod
@@ -48,8 +96,37 @@ class BMI:
         result = BMIResultEvaluator.evaluate(bmi)
         return result
 
+    @staticmethod
+    def calculate_bmi_batch(heights, weights) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores a whole population in one vectorized pass, returns (bmi values, category codes).
+        """
+        bmis = BMICalculator.get_bmi_indexes(heights, weights)
+        return bmis, BMIResultEvaluator.categorize(bmis)
+
+    @staticmethod
+    def calculate_bmi_csv(file_path: str, chunk_size: int = 100_000, height_column: str = 'height',
+                          weight_column: str = 'weight') -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Streams a large csv file in chunks of chunk_size rows, so only one chunk is held in memory at a time.
+        Blank lines are skipped.
+        """
+        with open(file_path, newline='') as csv_file:
+            reader = (row for row in csv.reader(csv_file) if row)
+            header = next(reader)
+            columns = [header.index(height_column), header.index(weight_column)]
+            while True:
+                rows = [[row[column] for column in columns] for row in islice(reader, chunk_size)]
+                if not rows:
+                    break
+                values = np.array(rows, dtype=np.float64)
+                yield BMI.calculate_bmi_batch(values[:, 0], values[:, 1])
+
 
 if __name__=="__main__":
     bmi_params = BMIParams(161, 60)
     print(BMI.calculate_bmi(bmi_params))
 
+    bmis, categories = BMI.calculate_bmi_batch([1.61, 1.75, 1.80], [45, 70, 110])
+    print(bmis.round(0), categories)
+
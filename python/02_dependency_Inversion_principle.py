@@ -14,7 +14,14 @@ Here in runtime we are resolving -> to use tester or bulb
 
 """
 
+import asyncio
+import sys
+import time
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Iterable, List, Optional
+
+import numpy as np
 
 class IDevice(ABC):
     
@@ -63,6 +70,55 @@ class Bulb(IDevice):
     def dim(self):
        return "Device: "+ self.__device+ " Dimmed"
 
+class DeviceBank(IDevice):
+    """
+    Holds a large grid of devices as two arrays - device kind and state - instead of one object per device.
+    glow/dim take a slice, an index array or a boolean mask and update all selected devices in one operation.
+    """
+    KINDS = ("Tester", "Bulb")
+    OFF, GLOWING, DIMMED = 0, 1, 2
+
+    def __init__(self, kinds) -> None:
+        super().__init__()
+        self.kinds = np.asarray(kinds, dtype=np.uint8)
+        self.states = np.full(self.kinds.shape, self.OFF, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def glow(self, selection=slice(None)):
+        self.states[selection] = self.GLOWING
+        return "Device: DeviceBank Glowed"
+
+    def dim(self, selection=slice(None)):
+        self.states[selection] = self.DIMMED
+        return "Device: DeviceBank Dimmed"
+
+    def device(self, index: int) -> IDevice:
+        return DeviceView(self, index)
+
+class DeviceView(IDevice):
+    """
+    Single device of a DeviceBank, created only when a caller asks for it.
+    """
+
+    def __init__(self, bank: DeviceBank, index: int) -> None:
+        super().__init__()
+        self.__bank = bank
+        self.__index = index
+
+    @property
+    def state(self) -> int:
+        return int(self.__bank.states[self.__index])
+
+    def glow(self):
+        self.__bank.states[self.__index] = DeviceBank.GLOWING
+        return "Device: "+ DeviceBank.KINDS[self.__bank.kinds[self.__index]]+ " Glowed"
+
+    def dim(self):
+        self.__bank.states[self.__index] = DeviceBank.DIMMED
+        return "Device: "+ DeviceBank.KINDS[self.__bank.kinds[self.__index]]+ " Dimmed"
+
 class Circut(ICircuit):
     def holder(self, device: IDevice):
         print(device.glow())
@@ -73,6 +129,127 @@ class Circut(ICircuit):
     def close(self):
         print("circuit close called")
 
+class IAsyncDevice(ABC):
+
+    @abstractmethod
+    async def glow(self):
+        pass
+
+    @abstractmethod
+    async def dim(self):
+        pass
+
+class AsyncDeviceAdapter(IAsyncDevice):
+    """
+    Lets the existing blocking IDevice implementations be driven by the async circuit, each call runs in a thread of
+    'executor' (the event loop's default executor when None).
+    """
+
+    def __init__(self, device: IDevice, executor: Optional[Executor] = None) -> None:
+        super().__init__()
+        self.device = device
+        self.executor = executor
+
+    async def glow(self):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.device.glow)
+
+    async def dim(self):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.device.dim)
+
+class CircuitResult:
+
+    def __init__(self, device, result: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+        self.device = device
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+class AsyncCircut(ICircuit):
+    """
+    Fans glow/dim out across many devices.
+        - at most 'concurrency' device calls are in flight,
+        - devices are fed through a queue of 'queue_size', so the producer waits when workers fall behind,
+        - every device call is cancelled after 'timeout' seconds and reported as an error.
+    Blocking IDevice calls run on a thread pool of 'concurrency' threads owned by the fan out, the default executor is
+    much smaller and would cap the concurrency. A thread stuck in a hung device call stays busy after its timeout.
+    """
+
+    def __init__(self, concurrency: int = 100, queue_size: int = 1000, timeout: float = 5.0) -> None:
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.is_open = False
+
+    async def holder(self, device: IDevice):
+        results = await self.glow_all([device])
+        return results[0]
+
+    async def glow_all(self, devices: Iterable) -> List[CircuitResult]:
+        return await self.__fan_out(devices, 'glow')
+
+    async def dim_all(self, devices: Iterable) -> List[CircuitResult]:
+        return await self.__fan_out(devices, 'dim')
+
+    def open(self):
+        self.is_open = True
+        return "circuit opened"
+
+    def close(self):
+        self.is_open = False
+        return "circuit closed"
+
+    async def __fan_out(self, devices: Iterable, operation: str) -> List[CircuitResult]:
+        if self.is_open:
+            raise RuntimeError("circuit is open")
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        results: List[CircuitResult] = []
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        async def worker():
+            while True:
+                index, device, async_device = await queue.get()
+                try:
+                    result = await asyncio.wait_for(getattr(async_device, operation)(), self.timeout)
+                    results[index] = CircuitResult(device, result=result)
+                except Exception as error:
+                    results[index] = CircuitResult(device, error=error)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for index, device in enumerate(devices):
+                results.append(None)
+                async_device = device if isinstance(device, IAsyncDevice) else AsyncDeviceAdapter(device, executor)
+                await queue.put((index, device, async_device))
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            executor.shutdown(wait=False)
+        return results
+
+def benchmark_device_bank(size: int = 1_000_000):
+    start = time.perf_counter()
+    bulbs = [Bulb() for _ in range(size)]
+    for bulb in bulbs:
+        bulb.glow()
+    for bulb in bulbs[::2]:
+        bulb.dim()
+    objects_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bank = DeviceBank(np.ones(size, dtype=np.uint8))
+    bank.glow()
+    bank.dim(slice(None, None, 2))
+    bank_time = time.perf_counter() - start
+
+    print(f"{size} devices - Bulb objects: {objects_time:.3f}s, DeviceBank: {bank_time:.4f}s, speedup: {objects_time / bank_time:.0f}x")
+
 if __name__ == "__main__":
     tester = tester()
     bulb = Bulb()
@@ -80,5 +257,17 @@ if __name__ == "__main__":
     circuit.holder(tester)
     circuit.holder(bulb)
 
+    async_circuit = AsyncCircut(concurrency=10, queue_size=20, timeout=1.0)
+    results = asyncio.run(async_circuit.glow_all([Bulb() for _ in range(50)] + [tester]))
+    print(f"{sum(result.ok for result in results)} of {len(results)} devices glowed, last: {results[-1].result}")
+
+    bank = DeviceBank([0, 1, 1, 1])
+    circuit.holder(bank)
+    bank.dim(bank.kinds == 1)
+    print(bank.states, bank.device(0).glow())
+
+    if "--benchmark" in sys.argv:
+        benchmark_device_bank()
+
         
 
@@ -3,7 +3,12 @@ In software engineering, the delegation pattern is an object-oriented design pat
 In delegation, an object handles a request by delegating to a second object. The delegate is a helper object, but with the original context
 """
 
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, List
 
 class IPrinter(ABC):
 
@@ -44,6 +49,77 @@ class PrintScanner(IPrintScanner):
         scanner = Scanner()
         print(scanner.scan())
 
+class PrintScanService(IPrintScanner):
+    """
+    Delegates to one long lived Printer and Scanner, jobs run on a thread pool and the caller gets a Future back.
+    queue_depth is the number of submitted jobs not yet picked by a worker, latencies holds the submit to finish time of recent jobs.
+    """
+
+    def __init__(self, max_workers: int = 8, printer: IPrinter = None, scanner: IScanner = None, latency_history: int = 10000) -> None:
+        self.__printer = printer or Printer()
+        self.__scanner = scanner or Scanner()
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__lock = threading.Lock()
+        self.__queued = 0
+        self.completed_jobs = 0
+        self.latencies = deque(maxlen=latency_history)
+
+    @property
+    def queue_depth(self) -> int:
+        return self.__queued
+
+    def print(self) -> Future:
+        return self.__submit(self.__printer.print)
+
+    def scan(self) -> Future:
+        return self.__submit(self.__scanner.scan)
+
+    def submit_batch(self, jobs: Iterable[str]) -> List[Future]:
+        """
+        jobs is a sequence of 'print' / 'scan' names.
+        """
+        delegates = {'print': self.__printer.print, 'scan': self.__scanner.scan}
+        return [self.__submit(delegates[job]) for job in jobs]
+
+    def shutdown(self, wait: bool = True):
+        self.__executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def __submit(self, job) -> Future:
+        with self.__lock:
+            self.__queued += 1
+        try:
+            future = self.__executor.submit(self.__run, job, time.perf_counter())
+        except BaseException:
+            self.__dequeue()
+            raise
+        # A job cancelled before a worker picked it never reaches __run.
+        future.add_done_callback(self.__on_done)
+        return future
+
+    def __on_done(self, future: Future):
+        if future.cancelled():
+            self.__dequeue()
+
+    def __dequeue(self):
+        with self.__lock:
+            self.__queued -= 1
+
+    def __run(self, job, submitted_at: float):
+        self.__dequeue()
+        try:
+            return job()
+        finally:
+            latency = time.perf_counter() - submitted_at
+            with self.__lock:
+                self.completed_jobs += 1
+                self.latencies.append(latency)
+
 if __name__ == "__main__":
     printer: IPrinter  = PrintScanner()
     printer.print()
@@ -51,3 +127,8 @@ if __name__ == "__main__":
     scanner: IScanner = PrintScanner()
     scanner.scan()
 
+    with PrintScanService(max_workers=4) as service:
+        futures = service.submit_batch(['print', 'scan'] * 500)
+        print(f"queue depth after burst: {service.queue_depth}")
+        results = [future.result() for future in futures]
+    print(f"{service.completed_jobs} jobs done, max latency: {max(service.latencies) * 1000:.2f} ms, first: {results[0]}")
@@ -14,7 +14,14 @@
     The validation algorithms (strategies), encapsulated separately from the validating object, may be used by other validating objects in different areas of the system (or even different systems) without code duplication.
     """
 
+import sys
+import time
+import tracemalloc
 from enum import Enum
+from functools import lru_cache
+from operator import attrgetter
+
+import numpy as np
 
 
 class SubType(Enum):
@@ -36,8 +43,8 @@ class IUIElement:
 
 
 class IUiElementBaseBuilder:
-    def __init__(self) -> None:
-        self.__ui_element: IUIElement = IUIElement()
+    def __init__(self, ui_element: IUIElement = None) -> None:
+        self.__ui_element: IUIElement = ui_element if ui_element is not None else IUIElement()
 
     def set_speed(self, speed: float):
         self.__ui_element.speed = speed
@@ -54,18 +61,21 @@ class IUiElementBaseBuilder:
     def get_instance(self):
         return self.__ui_element
 
+    def add_to(self, store: 'UIElementStore') -> int:
+        return store.add(self.get_instance())
+
 
 class SpinnerBuilder(IUiElementBaseBuilder):
     def __init__(self) -> None:
-        super().__init__()
         self.spinner: Spinner = Spinner()
+        super().__init__(self.spinner)
 
     def set_clockwise(self, clockWise: bool):
         self.spinner.clockWise = clockWise
         return self
 
     def set_expand(self, expand: bool):
-        self.spinner.clockWise = expand
+        self.spinner.expand = expand
         return self
 
     def get_instance(self):
@@ -74,8 +84,8 @@ class SpinnerBuilder(IUiElementBaseBuilder):
 
 class SliderBuilder(IUiElementBaseBuilder):
     def __init__(self) -> None:
-        super().__init__()
         self.slider: Slider = Slider()
+        super().__init__(self.slider)
 
     def set_vertical(self, vertical: bool):
         self.slider.vertical = vertical
@@ -91,18 +101,18 @@ class SliderBuilder(IUiElementBaseBuilder):
 
 class HoperBuilder(IUiElementBaseBuilder):
     def __init__(self) -> None:
-        super().__init__()
         self.hopper: Hopper = Hopper()
+        super().__init__(self.hopper)
 
     def set_visible(self, visible: bool):
-        self.hopper.vertical = visible
+        self.hopper.visible = visible
         return self
 
     def set_x_cordinate(self, x_cordinate: int):
         self.hopper.x_cordinate = x_cordinate
         return self
 
-    def set_x_cordinate(self, y_cordinate: int):
+    def set_y_cordinate(self, y_cordinate: int):
         self.hopper.y_cordinate = y_cordinate
         return self
 
@@ -141,6 +151,87 @@ class Hopper(IUIElement):
         return 'Hopper moved'
 
 
+class SlottedUIElement:
+    """
+    Slotted counterpart of IUIElement for the Slotted* elements, it has the same attributes and move() so Icon and
+    UIElementStore take either. It does not derive from IUIElement, whose __dict__ would undo the memory saving.
+    """
+    __slots__ = ('_subtype', 'speed', 'glow', 'energy')
+
+    def __init__(self) -> None:
+        self._subtype = None
+        self.speed: float = None
+        self.glow: float = None
+        self.energy: float = None
+
+    def move(self):
+        pass
+
+
+class SlottedSpinner(SlottedUIElement):
+    __slots__ = ('clockWise', 'expand')
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._subtype = SubType.SPINNER
+        self.clockWise: bool = None
+        self.expand: bool = None
+
+    def move(self):
+        return 'Spinner moved'
+
+
+class SlottedSlider(SlottedUIElement):
+    __slots__ = ('vertical', 'distance')
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._subtype = SubType.SLIDER
+        self.vertical: bool = None
+        self.distance: int = None
+
+    def move(self):
+        return 'Slider moved'
+
+
+class SlottedHopper(SlottedUIElement):
+    __slots__ = ('visible', 'x_cordinate', 'y_cordinate')
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._subtype = SubType.HOPPER
+        self.visible: bool = None
+        self.x_cordinate: int = None
+        self.y_cordinate: int = None
+
+    def move(self):
+        return 'Hopper moved'
+
+
+@lru_cache(maxsize=None)
+def attribute_formatter(element_type: type):
+    """
+    Built once per element class.
+    Fully slotted classes get a fixed template filled from a single attrgetter call,
+    dict backed classes can gain attributes at any time, so for them the set slots and vars() are read on every call.
+    """
+    fields = tuple(name for klass in reversed(element_type.__mro__) for name in klass.__dict__.get('__slots__', ()))
+    if not fields:
+        return lambda ui_element: ' '.join("'%s': '%s'" % item for item in vars(ui_element).items())
+    if any('__slots__' not in klass.__dict__ for klass in element_type.__mro__[:-1]):
+        def format_dynamic(ui_element: IUIElement):
+            items = [(name, getattr(ui_element, name)) for name in fields if hasattr(ui_element, name)]
+            items.extend(vars(ui_element).items())
+            return ' '.join("'%s': '%s'" % item for item in items)
+        return format_dynamic
+
+    template = ' '.join("'%s': '%%s'" % field for field in fields)
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda ui_element: template % (getter(ui_element),)
+    return lambda ui_element: template % getter(ui_element)
+
+
 class Icon():
 
     def __init__(self, ui_element: IUIElement) -> None:
@@ -150,9 +241,114 @@ class Icon():
     Here in run time, dynamically evaluate the move function, based on the element type. 
     """
     def move(self):
-        attrs = ' '.join("'%s': '%s'" % item for item in vars(
-            self.ui_element).items())
-        print(f'{self.ui_element.move()} with attributes, {attrs}')
+        print(self.describe_move())
+
+    def describe_move(self):
+        attrs = attribute_formatter(type(self.ui_element))(self.ui_element)
+        return f'{self.ui_element.move()} with attributes, {attrs}'
+
+
+class UIElementStore:
+    """
+    Struct of arrays store - every attribute of every element lives in one numpy column, a row per element.
+    move() dispatches once per SubType and moves the whole group with array operations instead of calling move() per object.
+    Unset numeric attributes are stored as 0 and unset flags as False.
+    """
+    SUBTYPES = tuple(SubType)
+    SUBTYPE_CODES = {subtype: code for code, subtype in enumerate(SUBTYPES)}
+    COLUMNS = {
+        'subtype': np.uint8, 'speed': np.float64, 'glow': np.float64, 'energy': np.float64,
+        'x_cordinate': np.float64, 'y_cordinate': np.float64, 'distance': np.float64, 'angle': np.float64,
+        'clockWise': np.bool_, 'expand': np.bool_, 'vertical': np.bool_, 'visible': np.bool_,
+    }
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.__size = 0
+        self.__columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+        self.__movers = {
+            SubType.SPINNER: self.__move_spinners,
+            SubType.SLIDER: self.__move_sliders,
+            SubType.HOPPER: self.__move_hoppers,
+        }
+
+    def __len__(self):
+        return self.__size
+
+    def column(self, name: str) -> np.ndarray:
+        return self.__columns[name][:self.__size]
+
+    def add(self, ui_element: IUIElement) -> int:
+        code = self.SUBTYPE_CODES.get(ui_element._subtype)
+        if code is None:
+            raise ValueError(f"{type(ui_element).__name__} has no SubType, only spinners, sliders and hoppers can be stored")
+        if self.__size == len(self.__columns['subtype']):
+            self.__grow()
+        row = self.__size
+        for name in self.COLUMNS:
+            if name == 'subtype':
+                value = code
+            else:
+                value = getattr(ui_element, name, None)
+            if value is not None:
+                self.__columns[name][row] = value
+        self.__size += 1
+        return row
+
+    def move(self):
+        """
+        Returns how many elements of each SubType were moved.
+        """
+        subtypes = self.column('subtype')
+        moved = {}
+        for code, subtype in enumerate(self.SUBTYPES):
+            rows = np.flatnonzero(subtypes == code)
+            if len(rows):
+                self.__movers[subtype](rows)
+            moved[subtype] = len(rows)
+        return moved
+
+    def __move_spinners(self, rows: np.ndarray):
+        direction = np.where(self.__columns['clockWise'][rows], 1.0, -1.0)
+        self.__columns['angle'][rows] += direction * self.__columns['speed'][rows]
+
+    def __move_sliders(self, rows: np.ndarray):
+        vertical = self.__columns['vertical'][rows]
+        distance = self.__columns['distance'][rows]
+        self.__columns['y_cordinate'][rows[vertical]] += distance[vertical]
+        self.__columns['x_cordinate'][rows[~vertical]] += distance[~vertical]
+
+    def __move_hoppers(self, rows: np.ndarray):
+        visible = rows[self.__columns['visible'][rows]]
+        self.__columns['x_cordinate'][visible] += self.__columns['speed'][visible]
+
+    def __grow(self):
+        for name, values in self.__columns.items():
+            grown = np.zeros(len(values) * 2, dtype=values.dtype)
+            grown[:len(values)] = values
+            self.__columns[name] = grown
+
+
+def benchmark_slotted_elements(count: int = 100_000):
+    def build(element_type):
+        elements = []
+        for index in range(count):
+            element = element_type()
+            element.x_cordinate = index
+            element.y_cordinate = index
+            elements.append(element)
+        return elements
+
+    for element_type in (Hopper, SlottedHopper):
+        tracemalloc.start()
+        elements = build(element_type)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        icons = [Icon(element) for element in elements]
+        start = time.perf_counter()
+        for icon in icons:
+            icon.describe_move()
+        elapsed = time.perf_counter() - start
+        print(f"{element_type.__name__}: {memory / count:.0f} bytes per element, moving {count} icons: {elapsed * 1000:.1f} ms")
 
 
 if __name__ == "__main__":
@@ -165,3 +361,13 @@ if __name__ == "__main__":
 
     Icon(hopper).move()
     Icon(spinner).move()
+    Icon(SlottedSlider()).move()
+
+    store = UIElementStore(capacity=2)
+    SpinnerBuilder().set_speed(2).set_clockwise(True).add_to(store)
+    SliderBuilder().set_distance(5).set_vertical(True).add_to(store)
+    HoperBuilder().set_visible(True).set_speed(1).add_to(store)
+    print(store.move(), store.column('angle'), store.column('x_cordinate'), store.column('y_cordinate'))
+
+    if "--benchmark" in sys.argv:
+        benchmark_slotted_elements()
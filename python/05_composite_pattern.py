@@ -38,8 +38,18 @@ For example, I can add another node, CollegeFriends, containing four friends, tw
 
 """
 
+import asyncio
+import bisect
+import mmap
+import os
+import tempfile
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from array import array
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional
+
+import numpy as np
 
 
 class IContact(ABC):
@@ -50,6 +60,9 @@ class IContact(ABC):
     def send_message(self, message: str):
         pass
 
+    def recipients(self) -> List['IContact']:
+        return [self]
+
 
 class Contact(IContact):
     def __init__(self, name: str, phone_number: str) -> None:
@@ -61,19 +74,339 @@ class Contact(IContact):
             f'message sent... details: name: {self.name}, message: {message}, phone_number: {self.phone_number}')
 
 class GroupContact(IContact):
+    """
+    Keeps a flattened recipient index - every leaf contact under the group, deduplicated by phone number - so a broadcast
+    does not walk the tree. The index is built iteratively on first use, add_contact drops the cached index of this
+    group and of every group above it so they are rebuilt on their next use.
+    """
 
     def __init__(self) -> None:
         self.__contacts: List[IContact] = []
+        self.__parents: List[GroupContact] = []
+        self.__recipients: Dict[str, IContact] = None
     
     def add_contact(self, contact: IContact):
         self.__contacts.append(contact)
+        if isinstance(contact, GroupContact):
+            contact.__parents.append(self)
+
+        # A group above can have an index while this one has none (building an index does not fill the
+        # indexes of the groups below), so the walk can not stop at the first group without an index.
+        groups, seen = [self], {id(self)}
+        while groups:
+            group = groups.pop()
+            group.__recipients = None
+            for parent in group.__parents:
+                if id(parent) not in seen:
+                    seen.add(id(parent))
+                    groups.append(parent)
+
+    def recipients(self) -> List[IContact]:
+        if self.__recipients is None:
+            recipients: Dict[str, IContact] = {}
+            stack, seen = [iter(self.__contacts)], {id(self)}
+            while stack:
+                contact = next(stack[-1], None)
+                if contact is None:
+                    stack.pop()
+                elif isinstance(contact, GroupContact):
+                    if id(contact) not in seen:
+                        seen.add(id(contact))
+                        stack.append(iter(contact.__contacts))
+                else:
+                    recipients.setdefault(contact.phone_number, contact)
+            self.__recipients = recipients
+        return list(self.__recipients.values())
     
     def send_message(self, message: str):
         print("--------------- Sending  group message --------------------")
-        for contact in self.__contacts:
+        for contact in self.recipients():
             contact.send_message(message=message)
 
 
+class IMessageGateway(ABC):
+
+    @abstractmethod
+    async def send_batch(self, recipients: List[IContact], message: str) -> int:
+        """
+        Sends one message to a batch of recipients, returns how many were accepted.
+        """
+        pass
+
+
+class InProcessGateway(IMessageGateway):
+    """
+    Local stub gateway for tests and demos, keeps every delivered (phone_number, message) pair in memory.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.delivered: List[tuple] = []
+
+    async def send_batch(self, recipients: List[IContact], message: str) -> int:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.delivered.extend((recipient.phone_number, message) for recipient in recipients)
+        return len(recipients)
+
+
+class TokenBucket:
+    """
+    Allows 'rate' tokens per second on average with bursts up to 'capacity' tokens.
+    An asyncio.Lock belongs to the event loop it is first used in, so the bucket keeps one lock per running loop and
+    can be used across asyncio.run calls.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.__tokens = capacity
+        self.__updated_at = time.monotonic()
+        self.__lock: asyncio.Lock = None
+        self.__lock_loop: asyncio.AbstractEventLoop = None
+
+    async def acquire(self, tokens: float = 1):
+        if tokens > self.capacity:
+            raise ValueError("cannot acquire more tokens than the bucket capacity")
+        loop = asyncio.get_running_loop()
+        if self.__lock_loop is not loop:
+            self.__lock, self.__lock_loop = asyncio.Lock(), loop
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated_at) * self.rate)
+                self.__updated_at = now
+                if self.__tokens >= tokens:
+                    self.__tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.__tokens) / self.rate)
+
+
+class MessagingMetrics:
+    """
+    messages and batches count what was sent, failed_messages and failed_batches what a gateway error dropped.
+    batch_latencies holds the latency of the most recent 'latency_history' sent batches.
+    """
+
+    def __init__(self, latency_history: int = 10_000) -> None:
+        self.messages = 0
+        self.batches = 0
+        self.failed_messages = 0
+        self.failed_batches = 0
+        self.elapsed = 0.0
+        self.batch_latencies: Deque[float] = deque(maxlen=latency_history)
+
+    @property
+    def throughput(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def max_batch_latency(self) -> float:
+        return max(self.batch_latencies, default=0.0)
+
+
+class BatchedMessenger:
+    """
+    Sends a message to a Contact or to every recipient of a GroupContact through a gateway,
+    in batches of 'batch_size', at most 'concurrency' batches in flight, rate limited to 'rate' messages per second.
+    A batch failing with one of 'gateway_errors' does not stop the other batches, it is counted in the metrics and left
+    out of the returned count. Any other error is raised once all batches are done.
+    """
+
+    def __init__(self, gateway: IMessageGateway, batch_size: int = 1000, concurrency: int = 10, rate: float = 100_000,
+                 gateway_errors: tuple = (OSError,)) -> None:
+        self.gateway = gateway
+        self.gateway_errors = gateway_errors
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(rate=rate, capacity=max(rate, batch_size))
+        self.metrics = MessagingMetrics()
+
+    async def send_message(self, contact: IContact, message: str) -> int:
+        recipients = contact.recipients()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started_at = time.perf_counter()
+
+        async def send(batch: List[IContact]) -> int:
+            async with semaphore:
+                await self.bucket.acquire(len(batch))
+                batch_started_at = time.perf_counter()
+                sent = await self.gateway.send_batch(batch, message)
+                self.metrics.batch_latencies.append(time.perf_counter() - batch_started_at)
+                self.metrics.batches += 1
+                return sent
+
+        batches = [recipients[start:start + self.batch_size] for start in range(0, len(recipients), self.batch_size)]
+        try:
+            results = await asyncio.gather(*(send(batch) for batch in batches), return_exceptions=True)
+        finally:
+            self.metrics.elapsed += time.perf_counter() - started_at
+        sent, error = 0, None
+        for batch, result in zip(batches, results):
+            if isinstance(result, self.gateway_errors):
+                self.metrics.failed_batches += 1
+                self.metrics.failed_messages += len(batch)
+            elif isinstance(result, BaseException):
+                error = error or result
+            else:
+                sent += result
+        self.metrics.messages += sent
+        if error is not None:
+            raise error
+        return sent
+
+
+class ContactDirectory:
+    """
+    Contact directory backed by a memory mapped file, one contact per line:
+
+        name,phone_number[,group/sub_group]
+
+    Opening the directory only maps the file, every index is built by the first lookup that needs it. The build walks
+    the lines in place on the mapping and keeps int64 arrays only:
+        - phone numbers: phone hashes sorted with the matching line offsets, searched with searchsorted,
+        - names: the line offsets sorted by lower cased name, a prefix is a bisect range over it that reads the names
+          from the mapping,
+        - groups: the member offsets of every group.
+    Contact objects are read from the mapping when a lookup returns them, and a GroupContact is built the first time
+    the group is accessed.
+    """
+    _NAME_CHUNK_SIZE = 65_536
+
+    def __init__(self, file_path: str) -> None:
+        self.__file = open(file_path, 'rb')
+        self.__mapping = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(file_path) else b''
+        self.__phone_hashes: np.ndarray = None
+        self.__phone_offsets: np.ndarray = None
+        self.__name_offsets: np.ndarray = None
+        self.__group_members: Dict[str, np.ndarray] = None
+        self.__sub_groups: Dict[str, List[str]] = None
+        self.__groups: Dict[str, GroupContact] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if isinstance(self.__mapping, mmap.mmap):
+            self.__mapping.close()
+        self.__file.close()
+
+    def __len__(self):
+        self.__ensure_phone_index()
+        return len(self.__phone_offsets)
+
+    def find_by_phone(self, phone_number: str) -> Optional[Contact]:
+        self.__ensure_phone_index()
+        key = hash(phone_number.encode())
+        start = np.searchsorted(self.__phone_hashes, key, side='left')
+        end = np.searchsorted(self.__phone_hashes, key, side='right')
+        # Later lines win, like assigning them to a dict in file order, and hash collisions are checked on the line.
+        for offset in reversed(self.__phone_offsets[start:end].tolist()):
+            contact = self.__contact_at(offset)
+            if contact.phone_number == phone_number:
+                return contact
+        return None
+
+    def find_by_name_prefix(self, prefix: str) -> Iterator[Contact]:
+        self.__ensure_name_index()
+        prefix = prefix.lower().encode()
+        start = bisect.bisect_left(self.__name_offsets, prefix, key=self.__name_key)
+        # 0xff never occurs in UTF-8, so every name starting with the prefix sorts before prefix + 0xff.
+        end = bisect.bisect_left(self.__name_offsets, prefix + b'\xff', lo=start, key=self.__name_key)
+        for offset in self.__name_offsets[start:end].tolist():
+            yield self.__contact_at(offset)
+
+    def group(self, path: str) -> Optional[GroupContact]:
+        self.__ensure_group_index()
+        if path not in self.__groups:
+            if path not in self.__group_members:
+                return None
+            group = GroupContact()
+            group.name = path
+            for offset in self.__group_members[path].tolist():
+                group.add_contact(self.__contact_at(offset))
+            for sub_group in self.__sub_groups.get(path, ()):
+                group.add_contact(self.group(sub_group))
+            self.__groups[path] = group
+        return self.__groups[path]
+
+    def __line_at(self, offset: int) -> bytes:
+        end = self.__mapping.find(b'\n', offset)
+        return self.__mapping[offset:end if end != -1 else len(self.__mapping)].rstrip(b'\r')
+
+    def __contact_at(self, offset: int) -> Contact:
+        name, phone_number = self.__line_at(offset).decode().split(',')[:2]
+        return Contact(name, phone_number)
+
+    def __name_key(self, offset: int) -> bytes:
+        return self.__line_at(offset).split(b',', 1)[0].decode().lower().encode()
+
+    def __lines(self) -> Iterator:
+        """
+        Yields (offset, fields) for every contact line, the fields are bytes. Only the current line is copied out of the
+        mapping.
+        """
+        mapping, offset, size = self.__mapping, 0, len(self.__mapping)
+        while offset < size:
+            end = mapping.find(b'\n', offset)
+            end = size if end == -1 else end
+            fields = mapping[offset:end].rstrip(b'\r').split(b',', 2)
+            if len(fields) >= 2:
+                yield offset, fields
+            offset = end + 1
+
+    def __ensure_phone_index(self):
+        if self.__phone_offsets is not None:
+            return
+        hashes, offsets = array('q'), array('q')
+        for offset, fields in self.__lines():
+            hashes.append(hash(fields[1]))
+            offsets.append(offset)
+        hashes, offsets = np.frombuffer(hashes, dtype=np.int64), np.frombuffer(offsets, dtype=np.int64)
+        order = np.argsort(hashes, kind='stable')
+        self.__phone_hashes, self.__phone_offsets = hashes[order], offsets[order]
+
+    def __ensure_name_index(self):
+        if self.__name_offsets is not None:
+            return
+        # Names are sorted as fixed width UTF-8 byte strings, which order like the strings themselves. They are
+        # packed in chunks so no list of every name is held, and are dropped once the offsets are sorted.
+        name_chunks, names, offsets = [], [], array('q')
+        for offset, fields in self.__lines():
+            names.append(fields[0].decode().lower().encode())
+            offsets.append(offset)
+            if len(names) == self._NAME_CHUNK_SIZE:
+                name_chunks.append(np.array(names, dtype=np.bytes_))
+                names = []
+        name_chunks.append(np.array(names, dtype=np.bytes_))
+        order = np.argsort(np.concatenate(name_chunks), kind='stable')
+        self.__name_offsets = np.frombuffer(offsets, dtype=np.int64)[order] if offsets else np.empty(0, dtype=np.int64)
+
+    def __ensure_group_index(self):
+        if self.__group_members is not None:
+            return
+        group_members, sub_groups = {}, {}
+        for offset, fields in self.__lines():
+            if len(fields) > 2 and fields[2]:
+                path = fields[2].decode()
+                if path not in group_members:
+                    group_members[path] = array('q')
+                    while '/' in path:
+                        parent = path.rsplit('/', 1)[0]
+                        sub_groups.setdefault(parent, []).append(path)
+                        if parent in group_members:
+                            break
+                        group_members[parent] = array('q')
+                        path = parent
+                group_members[fields[2].decode()].append(offset)
+        self.__group_members = {path: np.frombuffer(members, dtype=np.int64) if members else np.empty(0, dtype=np.int64)
+                                for path, members in group_members.items()}
+        self.__sub_groups = sub_groups
+
+
 if __name__ == "__main__":
     c1: IContact = Contact("mom", "1256389")
     c2: IContact = Contact("dad", "4532164")
@@ -92,5 +425,30 @@ if __name__ == "__main__":
     g1.send_message("Hello Everyone !")
     
 
+    # Nested groups, dad is in both groups but gets the message once
+    family: GroupContact = GroupContact()
+    family.add_contact(g1)
+    uncle_bob_family: GroupContact = GroupContact()
+    uncle_bob_family.add_contact(Contact("uncle bob", "9876543"))
+    uncle_bob_family.add_contact(c2)
+    family.add_contact(uncle_bob_family)
+    uncle_bob_family.add_contact(Contact("cousin nick", "6543210"))
+    family.send_message("Hello Family !")
 
+    # Sending a group message through a batched gateway
+    gateway = InProcessGateway(latency=0.01)
+    messenger = BatchedMessenger(gateway, batch_size=2, concurrency=2)
+    asyncio.run(messenger.send_message(family, "Hello Family, via gateway !"))
+    print(f"{messenger.metrics.messages} messages in {messenger.metrics.batches} batches, "
+          f"throughput: {messenger.metrics.throughput:.0f} msg/s, max batch latency: {messenger.metrics.max_batch_latency * 1000:.1f} ms")
 
+    # Loading contacts lazily from a file
+    with tempfile.TemporaryDirectory() as directory_path:
+        file_path = os.path.join(directory_path, 'contacts.csv')
+        with open(file_path, 'w') as contacts_file:
+            contacts_file.write("mom,1256389,family/parents\ndad,4532164,family/parents\n"
+                                "uncle bob,9876543,family/uncle bob's family\ncousin nick,6543210,family/uncle bob's family\n"
+                                "amy jackson,1112223\n")
+        with ContactDirectory(file_path) as contact_directory:
+            print(contact_directory.find_by_phone("9876543").name, [c.name for c in contact_directory.find_by_name_prefix("c")])
+            contact_directory.group("family").send_message("Hello from the directory !")
@@ -34,6 +34,14 @@ However, it’s not mandatory to implement fluent interfaces with builder design
 
  """
 
+import csv
+import json
+import os
+import tempfile
+from itertools import islice
+from operator import itemgetter
+from typing import Dict, Iterator
+
 
 class PatientInfo:
 
@@ -63,6 +71,138 @@ class PatientInfo:
         print("name: {} age: {} phone: {}, address: {}".format(self.name, self.age, self.phone_number, self.address))
 
 
+class PatientTable:
+    """
+    Columnar patient records - one list per field instead of one object per patient.
+    Rows are handed out as light weight PatientRow views over the columns.
+    """
+    FIELDS = ('name', 'age', 'address', 'phone_number')
+
+    def __init__(self) -> None:
+        self.columns: Dict[str, list] = {field: [] for field in self.FIELDS}
+
+    def __len__(self):
+        return len(self.columns['name'])
+
+    def __getitem__(self, index: int) -> 'PatientRow':
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return PatientRow(self, index % len(self))
+
+    def __iter__(self) -> Iterator['PatientRow']:
+        return (PatientRow(self, index) for index in range(len(self)))
+
+    def extend(self, other: 'PatientTable'):
+        for field in self.FIELDS:
+            self.columns[field].extend(other.columns[field])
+
+
+class PatientRow:
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table: PatientTable, index: int) -> None:
+        self._table = table
+        self._index = index
+
+    @property
+    def name(self):
+        return self._table.columns['name'][self._index]
+
+    @property
+    def age(self):
+        return self._table.columns['age'][self._index]
+
+    @property
+    def address(self):
+        return self._table.columns['address'][self._index]
+
+    @property
+    def phone_number(self):
+        return self._table.columns['phone_number'][self._index]
+
+    def set_name(self, name: str):
+        self._table.columns['name'][self._index] = name
+        return self
+
+    def set_age(self, age: int):
+        self._table.columns['age'][self._index] = age
+        return self
+
+    def set_address(self, address: str):
+        self._table.columns['address'][self._index] = address
+        return self
+
+    def set_phone_number(self, phone_number: str):
+        self._table.columns['phone_number'][self._index] = phone_number
+        return self
+
+    def display(self):
+        print("name: {} age: {} phone: {}, address: {}".format(self.name, self.age, self.phone_number, self.address))
+
+
+class PatientTableLoader:
+    """
+    Streams a .csv (with a header row) or .jsonl patient file in chunks of chunk_size records.
+    chunks() yields one PatientTable per chunk, load() collects them into a single table.
+    """
+
+    def __init__(self, chunk_size: int = 50_000) -> None:
+        self.chunk_size = chunk_size
+
+    def load(self, file_path: str) -> PatientTable:
+        table = PatientTable()
+        for chunk in self.chunks(file_path):
+            table.extend(chunk)
+        return table
+
+    def chunks(self, file_path: str) -> Iterator[PatientTable]:
+        with open(file_path, newline='') as patients_file:
+            rows = self.__jsonl_rows(patients_file) if file_path.endswith('.jsonl') else self.__csv_rows(patients_file)
+            while True:
+                batch = list(islice(rows, self.chunk_size))
+                if not batch:
+                    break
+                chunk = PatientTable()
+                for field, values in zip(PatientTable.FIELDS, zip(*batch)):
+                    chunk.columns[field] = [None if value == '' else value for value in values]
+                chunk.columns['age'] = [None if age is None else int(age) for age in chunk.columns['age']]
+                yield chunk
+
+    @staticmethod
+    def __csv_rows(patients_file) -> Iterator[tuple]:
+        reader = csv.reader(patients_file)
+        # csv.reader yields [] for a blank line, those are skipped.
+        rows = (row for row in reader if row)
+        header = next(rows, [])
+        positions = [header.index(field) if field in header else None for field in PatientTable.FIELDS]
+        width = max((position for position in positions if position is not None), default=-1) + 1
+
+        def checked_rows():
+            for row in rows:
+                if len(row) < width:
+                    raise ValueError(f"line {reader.line_num} has {len(row)} columns, "
+                                     f"the header needs at least {width}")
+                yield row
+
+        if None not in positions:
+            return map(itemgetter(*positions), checked_rows())
+        return (tuple(None if position is None else row[position] for position in positions) for row in checked_rows())
+
+    @staticmethod
+    def __jsonl_rows(patients_file) -> Iterator[tuple]:
+        for line in patients_file:
+            if line.strip():
+                record = json.loads(line)
+                yield tuple(record.get(field) for field in PatientTable.FIELDS)
+
+
 if __name__ == "__main__":
     p1=PatientInfo("jack").set_phone_number("77777").set_age(30).display()
     p2 = PatientInfo("jack").set_address("india").display()
+
+    patients_file_path = os.path.join(tempfile.mkdtemp(), 'patients.jsonl')
+    with open(patients_file_path, 'w') as patients_file:
+        patients_file.write('{"name": "jack", "age": 30, "phone_number": "77777"}\n{"name": "max", "address": "UK"}\n')
+    patients = PatientTableLoader(chunk_size=1).load(patients_file_path)
+    patients[1].set_age(41).display()
+    os.remove(patients_file_path)
@@ -19,6 +19,33 @@ The construction process must allow multiple representations of the same class
 
 The same fluent interface pattern can be now designed as builder pattern.
 """
+import csv
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List, Mapping
+
+
+def _load_sibling_module(file_name: str):
+    """
+    The pattern files start with a digit and can not be imported with an import statement, they are loaded by path.
+    """
+    spec = importlib.util.spec_from_file_location(os.path.splitext(file_name)[0],
+                                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# The columnar patient table is shared with the fluent interface example rather than copied.
+_fluent_interface = _load_sibling_module('06_fluent_interface_pattern.py')
+PatientTable = _fluent_interface.PatientTable
+PatientRow = _fluent_interface.PatientRow
+PatientTableLoader = _fluent_interface.PatientTableLoader
+
 
 class PatientInfo:
 
@@ -55,8 +82,121 @@ class PatientInfobuilder:
     def get_instance(self) -> PatientInfo:
         return self.__patientInfo
 
+class FromRecord:
+    """
+    Marks a plan field that is read from each input record, under 'key' or under the field's own name.
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key: str = None) -> None:
+        self.key = key
+
+
+class PatientInfoPlan:
+    """
+    Builder plan - the fluent chain is recorded once and compiled, the compiled plan then builds a PatientInfo per
+    input record without creating a builder or calling a setter per field.
+    Every set_* either fixes a shared default (template) or, with FromRecord, reads the value from each record.
+    A new plan can start from another plan's steps through 'template'.
+    The compiled function is kept until the next set_* call, so compile() and build_many() reuse it.
+    """
+    MANDATORY_FIELDS = ('name',)
+
+    def __init__(self, template: 'PatientInfoPlan' = None) -> None:
+        self.__defaults: Dict[str, object] = dict(template.__defaults) if template else {}
+        self.__sources: Dict[str, str] = dict(template.__sources) if template else {}
+        self.__compiled: Callable[[Mapping], PatientInfo] = None
+
+    def set_name(self, name=FromRecord()):
+        return self.__record('name', name)
+
+    def set_age(self, age=FromRecord()):
+        return self.__record('age', age)
+
+    def set_address(self, address=FromRecord()):
+        return self.__record('address', address)
+
+    def set_phone_number(self, phone_number=FromRecord()):
+        return self.__record('phone_number', phone_number)
+
+    def compile(self) -> Callable[[Mapping], PatientInfo]:
+        if self.__compiled is not None:
+            return self.__compiled
+        missing = [field for field in self.MANDATORY_FIELDS if field not in self.__defaults and field not in self.__sources]
+        if missing:
+            raise ValueError(f"plan does not set mandatory fields: {', '.join(missing)}")
+
+        # The plan is resolved once into (field, key) and (field, default) tuples the build closure loops over.
+        defaults = tuple((field, self.__defaults.get(field)) for field in PatientTable.FIELDS if field not in self.__sources)
+        mandatory = tuple((field, key) for field, key in self.__sources.items() if field in self.MANDATORY_FIELDS)
+        optional = tuple((field, key) for field, key in self.__sources.items() if field not in self.MANDATORY_FIELDS)
+        new_patient_info = PatientInfo.__new__
+
+        def build(record: Mapping) -> PatientInfo:
+            values = dict(defaults)
+            try:
+                for field, key in mandatory:
+                    values[field] = record[key]
+            except KeyError as error:
+                raise ValueError(f'record is missing mandatory field {error}') from None
+            for field, key in optional:
+                values[field] = record.get(key)
+            patient_info = new_patient_info(PatientInfo)
+            patient_info.__dict__ = values
+            return patient_info
+
+        self.__compiled = build
+        return build
+
+    def build_many(self, records: Iterable[Mapping]) -> List[PatientInfo]:
+        build = self.compile()
+        return [build(record) for record in records]
+
+    def __record(self, field: str, value):
+        self.__compiled = None
+        self.__defaults.pop(field, None)
+        self.__sources.pop(field, None)
+        if isinstance(value, FromRecord):
+            self.__sources[field] = value.key or field
+        else:
+            self.__defaults[field] = value
+        return self
+
+
+def benchmark_patient_ingest(count: int = 200_000):
+    patients_file_path = os.path.join(tempfile.mkdtemp(), 'patients.csv')
+    with open(patients_file_path, 'w', newline='') as patients_file:
+        writer = csv.writer(patients_file)
+        writer.writerow(PatientTable.FIELDS)
+        writer.writerows((f"patient {index}", index % 100, f"street {index % 500}", f"{index:010d}") for index in range(count))
+
+    def build_objects(file_path: str):
+        with open(file_path, newline='') as patients_file:
+            return [PatientInfobuilder().set_name(record['name']).set_age(int(record['age']))
+                    .set_address(record['address']).set_phone_number(record['phone_number']).get_instance()
+                    for record in csv.DictReader(patients_file)]
+
+    for label, ingest in (("PatientInfobuilder", build_objects), ("PatientTable", PatientTableLoader().load)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        records = ingest(patients_file_path)
+        elapsed = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{label}: {count / elapsed:,.0f} records/s, {memory / len(records):.0f} bytes per record")
+    os.remove(patients_file_path)
+
+
 if __name__ == "__main__":
     p1: PatientInfo = PatientInfobuilder().set_name("Jack").set_age(30).get_instance().display()
     p2: PatientInfo = PatientInfobuilder().set_name("Max").set_address("UK").get_instance().display()
 
+    uk_patient = PatientInfoPlan().set_name().set_age(FromRecord('patient_age')).set_address("UK")
+    build_uk_patient = uk_patient.compile()
+    build_uk_patient({'name': "Jack", 'patient_age': 30}).display()
+    uk_patient_with_phone = PatientInfoPlan(template=uk_patient).set_phone_number()
+    for patient in uk_patient_with_phone.build_many([{'name': "Max", 'phone_number': "77777"}, {'name': "Lily"}]):
+        patient.display()
 
+    if "--benchmark" in sys.argv:
+        benchmark_patient_ingest()
@@ -15,8 +15,20 @@ Real-World Analogy:
         - If it’s a coffee shop, he sells fire and flood insurance (natural_calamity_insurance).
 """
 
+import csv
+import os
+import queue
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import numpy as np
 
 
 class IInsuranceVisitor(ABC):
@@ -33,27 +45,47 @@ class IInsuranceVisitor(ABC):
     def provide_natural_calamity_insurance(self, natural_calamity_insurance):
         pass
 
+    # Optional batch handlers, used by InsuranceBatchRunner - override them to process all policies of a type at once.
+    def provide_medical_insurances(self, medical_insurances):
+        return [self.provide_medical_insurance(medical_insurance) for medical_insurance in medical_insurances]
+
+    def provide_theft_insurances(self, theft_insurances):
+        return [self.provide_theft_insurance(theft_insurance) for theft_insurance in theft_insurances]
+
+    def provide_natural_calamity_insurances(self, natural_calamity_insurances):
+        return [self.provide_natural_calamity_insurance(natural_calamity_insurance)
+                for natural_calamity_insurance in natural_calamity_insurances]
+
+    # Merges the per chunk results of ParallelInsuranceRunner, by default into one list in policy order.
+    def reduce_results(self, chunk_results: List[list]):
+        return [result for chunk_result in chunk_results for result in chunk_result]
+
 
 class IInsurance(ABC):
+    # Name of the IInsuranceVisitor batch handler for this type, None when the type can only be visited one by one.
+    _batch_visit_method: str = None
+
     @abstractmethod
     def provide_insurance(self, visitor: IInsuranceVisitor):
         pass
 
 
 class MedicalInsurance(IInsurance):
+    _batch_visit_method = 'provide_medical_insurances'
 
-    def __init__(self, customer_name: str = None, customer_age: str = None, is_smoker: str = None, existing_deseases: List[str] = []) -> None:
+    def __init__(self, customer_name: str = None, customer_age: str = None, is_smoker: str = None, existing_deseases: List[str] = None) -> None:
         self.insurance_type: str = 'Medical insurance'
         self.customer_name: str = customer_name
         self.customer_age: str = customer_age
         self.is_smoker: bool = is_smoker
-        self.existing_deseases: List[str] = existing_deseases
+        self.existing_deseases: List[str] = existing_deseases if existing_deseases is not None else []
 
     def provide_insurance(self, visitor: IInsuranceVisitor):
         return visitor.provide_medical_insurance(self)
 
 
 class TheftInsurance(IInsurance):
+    _batch_visit_method = 'provide_theft_insurances'
 
     def __init__(self, bank_name: str = None) -> None:
         self.insurance_type = 'Theft Insurance'
@@ -64,6 +96,7 @@ class TheftInsurance(IInsurance):
 
 
 class NaturalCalamityInsurance(IInsurance):
+    _batch_visit_method = 'provide_natural_calamity_insurances'
 
     def __init__(self,  customer_name: str = None, property_name: str = None, property_value=None, property_construction_date: str = None) -> None:
         self.insurance_type = 'Natural Calamity Insurance'
@@ -95,14 +128,208 @@ class InsuranceVisitor(IInsuranceVisitor):
 
 
 class Insurance(IInsurance):
-    def __init__(self, insurance_list: List[IInsurance] = []) -> None:
-        self.insurance_list = insurance_list
+    def __init__(self, insurance_list: List[IInsurance] = None) -> None:
+        self.insurance_list = insurance_list if insurance_list is not None else []
 
     def provide_insurance(self, visitor: IInsuranceVisitor):
         for insurance in self.insurance_list:
             insurance.provide_insurance(visitor)
 
 
+def _leaf_policies(insurance: Insurance) -> Iterator[IInsurance]:
+    """
+    Yields the policies of an Insurance in order, with nested Insurance composites flattened without recursion.
+    """
+    pending = [iter(insurance.insurance_list)]
+    while pending:
+        policy = next(pending[-1], None)
+        if policy is None:
+            pending.pop()
+        elif isinstance(policy, Insurance):
+            pending.append(iter(policy.insurance_list))
+        else:
+            yield policy
+
+
+@lru_cache(maxsize=None)
+def _batch_handler(visitor_type: type, insurance_type: type):
+    if insurance_type._batch_visit_method is None:
+        return None
+    return getattr(visitor_type, insurance_type._batch_visit_method)
+
+
+class InsuranceBatchRunner:
+    """
+    Groups the policies of an Insurance by concrete type and calls the visitor once per type with the whole batch.
+    The handler for a (visitor type, policy type) pair is resolved once and cached.
+    Policies of a type without a batch handler are visited one by one, nested Insurance composites are flattened.
+    """
+
+    def __init__(self, visitor: IInsuranceVisitor) -> None:
+        self.visitor = visitor
+
+    def run(self, insurance: 'Insurance') -> Dict[type, object]:
+        batches: Dict[type, List[IInsurance]] = defaultdict(list)
+        for policy in _leaf_policies(insurance):
+            batches[type(policy)].append(policy)
+
+        results = {}
+        visitor_type = type(self.visitor)
+        for insurance_type, policies in batches.items():
+            handler = _batch_handler(visitor_type, insurance_type)
+            if handler is None:
+                results[insurance_type] = [policy.provide_insurance(self.visitor) for policy in policies]
+            else:
+                results[insurance_type] = handler(self.visitor, policies)
+        return results
+
+
+class StreamingInsurance(IInsurance):
+    """
+    Insurance composite over any iterable or generator of policies, policies are visited as they are produced so memory
+    does not grow with the number of policies. A generator can be visited only once.
+    With look_ahead > 0 a background thread reads up to look_ahead policies ahead of the visitor (at least 3, one each
+    being read, queued and visited), which overlaps reading a policy file with visiting.
+    """
+
+    def __init__(self, policies: Iterable[IInsurance], look_ahead: int = 0) -> None:
+        self.policies = policies
+        self.look_ahead = look_ahead
+
+    def provide_insurance(self, visitor: IInsuranceVisitor, stop_when: Callable[[object], bool] = None):
+        """
+        Visits every policy, or until stop_when(result) returns True. Returns the number of policies visited.
+        """
+        visited = 0
+        for result in self.visit(visitor):
+            visited += 1
+            if stop_when is not None and stop_when(result):
+                break
+        return visited
+
+    def visit(self, visitor: IInsuranceVisitor) -> Iterator[object]:
+        """
+        Lazily yields the visitor result of every policy, stop iterating to stop reading policies.
+        """
+        for policy in self.__policies():
+            yield policy.provide_insurance(visitor)
+
+    def __policies(self) -> Iterator[IInsurance]:
+        if self.look_ahead <= 0:
+            yield from self.policies
+            return
+
+        # Policies are handed over in small batches. Besides the queued batches the reader holds the batch it is
+        # putting and the visitor the batch it is consuming, so the queue takes two batches less than fit in look_ahead.
+        batch_size = max(1, self.look_ahead // 4)
+        buffer: queue.Queue = queue.Queue(maxsize=max(1, self.look_ahead // batch_size - 2))
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read_ahead():
+            try:
+                policies = iter(self.policies)
+                while True:
+                    batch = list(islice(policies, batch_size))
+                    if not put(batch) or not batch:
+                        return
+            except BaseException as error:
+                put(error)
+
+        reader = threading.Thread(target=read_ahead, daemon=True)
+        reader.start()
+        try:
+            while True:
+                batch = buffer.get()
+                if isinstance(batch, BaseException):
+                    raise batch
+                if not batch:
+                    return
+                yield from batch
+        finally:
+            stopped.set()
+            reader.join()
+
+
+def medical_policies_from_csv(file_path: str) -> Iterator[MedicalInsurance]:
+    """
+    Reads medical policies row by row from a csv file with customer_name, customer_age and is_smoker columns.
+    """
+    with open(file_path, newline='') as policies_file:
+        for row in csv.DictReader(policies_file):
+            yield MedicalInsurance(customer_name=row['customer_name'], customer_age=int(row['customer_age']),
+                                   is_smoker=row['is_smoker'] == 'true')
+
+
+def _visit_chunk(visitor: IInsuranceVisitor, chunk: List[IInsurance]):
+    started_at = time.perf_counter()
+    results = [policy.provide_insurance(visitor) for policy in chunk]
+    return results, time.perf_counter() - started_at
+
+
+class ParallelInsuranceRunner:
+    """
+    Splits the policy list, with nested Insurance composites flattened, into chunks of 'chunk_size' and visits the
+    chunks in a process pool.
+    The visitor and the policies must be picklable, the per chunk results are merged with visitor.reduce_results.
+    on_progress(finished_chunks, total_chunks, seconds) is called as every chunk finishes,
+    chunk_timings holds the time spent visiting each chunk in its worker.
+    """
+
+    def __init__(self, visitor: IInsuranceVisitor, chunk_size: int = 100_000, max_workers: int = None,
+                 on_progress: Callable[[int, int, float], None] = None) -> None:
+        self.visitor = visitor
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.on_progress = on_progress
+        self.chunk_timings: List[float] = []
+
+    def run(self, insurance: 'Insurance'):
+        policies = list(_leaf_policies(insurance))
+        chunks = [policies[start:start + self.chunk_size] for start in range(0, len(policies), self.chunk_size)]
+        chunk_results = [None] * len(chunks)
+        self.chunk_timings = [None] * len(chunks)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(_visit_chunk, self.visitor, chunk): index for index, chunk in enumerate(chunks)}
+            for finished, future in enumerate(as_completed(futures), start=1):
+                index = futures[future]
+                chunk_results[index], self.chunk_timings[index] = future.result()
+                if self.on_progress:
+                    self.on_progress(finished, len(chunks), self.chunk_timings[index])
+        return self.visitor.reduce_results(chunk_results)
+
+
+class PremiumVisitor(InsuranceVisitor):
+    """
+    Prices policies, medical policies can be priced for a whole batch with numpy. reduce_results gives the total premium.
+    """
+
+    def provide_medical_insurance(self, medical_insurance: MedicalInsurance):
+        return 100 + (medical_insurance.customer_age or 0) * 2.5 + (150 if medical_insurance.is_smoker else 0)
+
+    def provide_theft_insurance(self, theft_insurance: TheftInsurance):
+        return 500
+
+    def provide_natural_calamity_insurance(self, natural_calamity_insurance: NaturalCalamityInsurance):
+        return 0.01 * (natural_calamity_insurance.property_value or 0)
+
+    def reduce_results(self, chunk_results: List[list]):
+        return sum(sum(chunk_result) for chunk_result in chunk_results)
+
+    def provide_medical_insurances(self, medical_insurances: List[MedicalInsurance]):
+        ages = np.array([insurance.customer_age or 0 for insurance in medical_insurances], dtype=np.float64)
+        smokers = np.array([bool(insurance.is_smoker) for insurance in medical_insurances])
+        return 100 + ages * 2.5 + smokers * 150
+
+
 if __name__ == "__main__":
     m = MedicalInsurance(customer_name="Jack")
     t = TheftInsurance(bank_name="City Bank")
@@ -113,3 +340,26 @@ if __name__ == "__main__":
 
     visitor = InsuranceVisitor()
     insurance.provide_insurance(visitor)
+
+    premiums = InsuranceBatchRunner(PremiumVisitor()).run(
+        Insurance(insurance_list=[m, t, MedicalInsurance(customer_name="Max", customer_age=40, is_smoker=True)]))
+    print(f"Medical premiums: {premiums[MedicalInsurance]}")
+
+    policies = Insurance(insurance_list=[MedicalInsurance(customer_name=f"customer {index}", customer_age=index % 90)
+                                         for index in range(10_000)] + [t])
+    def report_progress(finished: int, total: int, seconds: float):
+        print(f"chunk {finished}/{total} visited in {seconds * 1000:.1f} ms")
+
+    runner = ParallelInsuranceRunner(PremiumVisitor(), chunk_size=2_500, max_workers=2, on_progress=report_progress)
+    total = runner.run(policies)
+    print(f"Total premium: {total}")
+
+    with tempfile.TemporaryDirectory() as directory_path:
+        file_path = os.path.join(directory_path, 'policies.csv')
+        with open(file_path, 'w', newline='') as policies_file:
+            writer = csv.writer(policies_file)
+            writer.writerow(['customer_name', 'customer_age', 'is_smoker'])
+            writer.writerows((f"customer {index}", 20 + index % 60, 'true' if index % 7 == 0 else 'false') for index in range(1_000))
+        streaming_insurance = StreamingInsurance(medical_policies_from_csv(file_path), look_ahead=64)
+        visited = streaming_insurance.provide_insurance(PremiumVisitor(), stop_when=lambda premium: premium > 300)
+        print(f"Visited {visited} streamed policies until the first premium above 300")
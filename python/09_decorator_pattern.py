@@ -20,58 +20,174 @@ Each topping decorator would know about the pizzas that it is decorating and it'
 GetPrice() method of Topping object would return cumulative price of both pizza and the topping.
 """
 
-from abc import ABC, abstractmethod
+import random
+import sys
+import time
+from abc import ABC
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple, Type
+
+import numpy as np
 
 
 class BasePizza(ABC):
     _price: int = None
     _name: str = None
 
-    @abstractmethod
     def get_price(self):
         return self._price
 
 
 class Margherita(BasePizza):
-    def __init__(self) -> None:
-        self._price = 100
-        self._name = "Margherita"
+    _price = 100
+    _name = "Margherita"
 
 
 class Gourmet(BasePizza):
-    def __init__(self) -> None:
-        self._price = 200
-        self._name = "Gourmet"
+    _price = 200
+    _name = "Gourmet"
 
 
 class ToppingsDecorator(BasePizza):
+    """
+    The total price is computed once when the topping wraps the pizza, so get_price() is O(1) and does not recurse
+    through the chain however many toppings there are.
+    """
 
     def __init__(self, base_pizza: BasePizza) -> None:
         self.base_pizza = base_pizza
+        self._total_price = self._price + base_pizza.get_price()
 
     def get_price(self):
-        return self._price + self.base_pizza.get_price()
+        return self._total_price
+
+    def compact(self) -> 'FlatPizza':
+        """
+        Flattens the decorator chain into the base pizza and a count per topping type.
+        """
+        topping_counts: Counter = Counter()
+        pizza: BasePizza = self
+        while isinstance(pizza, ToppingsDecorator):
+            topping_counts[type(pizza)] += 1
+            pizza = pizza.base_pizza
+        if isinstance(pizza, FlatPizza):
+            topping_counts.update(pizza.topping_counts)
+            pizza = pizza.base_pizza
+        return FlatPizza(pizza, topping_counts)
+
+
+class FlatPizza(BasePizza):
+    """
+    Flat form of a decorated pizza - base pizza plus a topping count vector, with the total price cached.
+    A FlatPizza is never changed after it is built, add_topping returns a new one, so toppings that already wrap it
+    keep a correct cached price.
+    """
+
+    def __init__(self, base_pizza: BasePizza, topping_counts: Dict[Type[ToppingsDecorator], int] = None) -> None:
+        self.base_pizza = base_pizza
+        self._name = base_pizza._name
+        self.topping_counts: Counter = Counter(topping_counts or {})
+        self._price = base_pizza.get_price() + sum(topping._price * count for topping, count in self.topping_counts.items())
+
+    def add_topping(self, topping: Type[ToppingsDecorator], count: int = 1) -> 'FlatPizza':
+        topping_counts = self.topping_counts.copy()
+        topping_counts[topping] += count
+        return FlatPizza(self.base_pizza, topping_counts)
 
 
 class ExtraCheeseTopping(ToppingsDecorator):
-    def __init__(self, base_pizza: BasePizza) -> None:
-        self._price = 25
-        self._name = "ExtraCheeseTopping"
-        super().__init__(base_pizza)
+    _price = 25
+    _name = "ExtraCheeseTopping"
 
 
 class MushroomTopping(ToppingsDecorator):
-    def __init__(self, base_pizza: BasePizza) -> None:
-        self._price = 35
-        self._name = "MushroomTopping"
-        super().__init__(base_pizza)
+    _price = 35
+    _name = "MushroomTopping"
 
 
 class JalapenoTopping(ToppingsDecorator):
-    def __init__(self, base_pizza: BasePizza) -> None:
-        self._price = 55
-        self._name = "JalapenoTopping"
-        super().__init__(base_pizza)
+    _price = 55
+    _name = "JalapenoTopping"
+
+
+class MenuPricingEngine:
+    """
+    Prices orders without building decorator chains.
+    The registered pizza and topping classes give a price vector (one entry per menu item, taken from their _price),
+    an order is a count vector over the same items, so a whole batch of orders is priced with one dot product.
+    price() memoizes single orders by (pizza, toppings multiset) in an LRU cache.
+    """
+
+    def __init__(self, menu_items: Iterable[Type[BasePizza]] = (), memo_size: int = 4096) -> None:
+        self.menu_items: List[Type[BasePizza]] = []
+        self.positions: Dict[Type[BasePizza], int] = {}
+        self.prices = np.zeros(0, dtype=np.int64)
+        self.__cached_price = lru_cache(maxsize=memo_size)(self.__price)
+        self.register(*menu_items)
+
+    def register(self, *menu_items: Type[BasePizza]):
+        for menu_item in menu_items:
+            if menu_item not in self.positions:
+                self.positions[menu_item] = len(self.menu_items)
+                self.menu_items.append(menu_item)
+        self.prices = np.array([menu_item._price for menu_item in self.menu_items], dtype=np.int64)
+        self.__cached_price.cache_clear()
+
+    def encode(self, orders: Iterable[Tuple[Type[BasePizza], Iterable[Type[ToppingsDecorator]]]]) -> np.ndarray:
+        """
+        Turns (pizza, toppings) orders into an order matrix, a row of menu item counts per order.
+        """
+        positions = self.positions
+        cells: List[int] = []
+        width = len(self.menu_items)
+        rows = 0
+        for row, (pizza, toppings) in enumerate(orders):
+            offset = row * width
+            cells.append(offset + positions[pizza])
+            cells.extend(offset + positions[topping] for topping in toppings)
+            rows = row + 1
+        return np.bincount(np.array(cells, dtype=np.int64), minlength=rows * width).reshape(rows, width)
+
+    def price_orders(self, order_matrix: np.ndarray) -> np.ndarray:
+        return order_matrix @ self.prices
+
+    def price(self, pizza: Type[BasePizza], toppings: Iterable[Type[ToppingsDecorator]]) -> int:
+        positions = self.positions
+        return self.__cached_price(positions[pizza], tuple(sorted(map(positions.__getitem__, toppings))))
+
+    def __price(self, pizza_position: int, topping_positions: Tuple[int, ...]) -> int:
+        return int(self.prices[pizza_position] + self.prices[list(topping_positions)].sum())
+
+
+def benchmark_menu_pricing(count: int = 100_000):
+    pizzas, toppings = [Margherita, Gourmet], [ExtraCheeseTopping, MushroomTopping, JalapenoTopping]
+    engine = MenuPricingEngine(pizzas + toppings)
+    orders = [(random.choice(pizzas), random.choices(toppings, k=random.randint(0, 5))) for _ in range(count)]
+
+    start = time.perf_counter()
+    chain_prices = []
+    for pizza, order_toppings in orders:
+        decorated: BasePizza = pizza()
+        for topping in order_toppings:
+            decorated = topping(decorated)
+        chain_prices.append(decorated.get_price())
+    chain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = engine.encode(orders)
+    encode_time = time.perf_counter() - start
+    start = time.perf_counter()
+    engine_prices = engine.price_orders(matrix)
+    dot_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    memo_prices = [engine.price(pizza, order_toppings) for pizza, order_toppings in orders]
+    memo_time = time.perf_counter() - start
+
+    assert chain_prices == engine_prices.tolist() == memo_prices
+    print(f"{count} orders - decorator chains: {chain_time * 1000:.1f} ms, "
+          f"order matrix: {encode_time * 1000:.1f} ms to encode + {dot_time * 1000:.2f} ms to price, memoized: {memo_time * 1000:.1f} ms")
 
 
 if __name__ == "__main__":
@@ -89,3 +205,15 @@ if __name__ == "__main__":
     moreJalapeno = JalapenoTopping(moreMushroom)
     print(
         f"Plain Margherita with double extra cheese with mushroom with Jalapeno: {moreJalapeno.get_price()}")
+
+    flat_pizza = moreJalapeno.compact().add_topping(MushroomTopping, count=1000)
+    print(f"Flattened with 1000 more mushroom toppings: {flat_pizza.get_price()}, toppings: "
+          f"{ {topping._name: count for topping, count in flat_pizza.topping_counts.items()} }")
+
+    menu = MenuPricingEngine([Margherita, Gourmet, ExtraCheeseTopping, MushroomTopping, JalapenoTopping])
+    order_matrix = menu.encode([(Margherita, [ExtraCheeseTopping, ExtraCheeseTopping, MushroomTopping, JalapenoTopping]),
+                                (Gourmet, [MushroomTopping])])
+    print(f"Menu engine prices: {menu.price_orders(order_matrix)}, memoized: {menu.price(Gourmet, [MushroomTopping])}")
+
+    if "--benchmark" in sys.argv:
+        benchmark_menu_pricing()
@@ -28,7 +28,13 @@ https://en.wikipedia.org/wiki/State_pattern
 
 """
 
+import asyncio
+import heapq
+import time
 from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Type
+
+import numpy as np
 
 
 class TrafficLight:
@@ -44,6 +50,17 @@ class TrafficLight:
 
 
 class ITrafficLight(ABC):
+    """
+    States hold no per light data, so each state class has a single shared (flyweight) instance -
+    RedTrafficLight() always returns the same object and change() does not allocate.
+    """
+    _instances: Dict[type, 'ITrafficLight'] = {}
+
+    def __new__(cls):
+        instance = ITrafficLight._instances.get(cls)
+        if instance is None:
+            instance = ITrafficLight._instances[cls] = super().__new__(cls)
+        return instance
 
     @abstractmethod
     def change(self, traffic_light: TrafficLight):
@@ -81,6 +98,116 @@ class GreenTrafficLight(ITrafficLight):
         print('Green Light')
 
 
+class TrafficLightGrid:
+    """
+    Table driven traffic lights - the state classes reachable from 'initial_state' are compiled into a transition
+    array once, the lights are a numpy vector of state codes and change() advances every (or every masked) light
+    with one array lookup.
+    """
+
+    def __init__(self, size: int, initial_state: Type[ITrafficLight] = RedTrafficLight) -> None:
+        self.states: List[ITrafficLight] = []
+        codes: Dict[ITrafficLight, int] = {}
+        next_states: List[ITrafficLight] = []
+        probe = TrafficLight()
+        state = initial_state()
+        while state not in codes:
+            codes[state] = len(self.states)
+            self.states.append(state)
+            probe.state = state
+            probe.change()
+            next_states.append(probe.state)
+            state = probe.state
+        self.transitions = np.array([codes[next_state] for next_state in next_states], dtype=np.uint8)
+        self.codes = np.zeros(size, dtype=np.uint8)
+
+    def change(self, mask: np.ndarray = None):
+        if mask is None:
+            self.codes = self.transitions[self.codes]
+        else:
+            self.codes[mask] = self.transitions[self.codes[mask]]
+
+    def state(self, index: int) -> ITrafficLight:
+        return self.states[self.codes[index]]
+
+    def report_state(self, index: int):
+        self.state(index).report_state()
+
+
+class TrafficSimulation:
+    """
+    Discrete event simulation of many TrafficLight instances.
+    Every light stays in a state for durations[state class] simulated seconds, the next change of every light is kept
+    in a heap ordered by time. run() replays as fast as possible, run_realtime() paces the events on the asyncio loop,
+    time_scale simulated seconds per real second.
+    """
+
+    def __init__(self, durations: Dict[Type[ITrafficLight], float], on_change: Callable[[float, TrafficLight], None] = None) -> None:
+        self.durations = durations
+        self.on_change = on_change
+        self.lights: List[TrafficLight] = []
+        self.now = 0.0
+        self.events_processed = 0
+        self.elapsed = 0.0
+        self.__events: List[tuple] = []
+
+    @property
+    def queue_size(self) -> int:
+        return len(self.__events)
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events_processed / self.elapsed if self.elapsed else 0.0
+
+    def add(self, traffic_light: TrafficLight, offset: float = 0.0):
+        """
+        Schedules the first change of traffic_light 'offset' seconds after it enters its current state.
+        """
+        index = len(self.lights)
+        self.lights.append(traffic_light)
+        heapq.heappush(self.__events, (self.now + offset + self.durations[type(traffic_light.state)], index))
+
+    def run(self, until: float) -> int:
+        started_at = time.perf_counter()
+        processed = 0
+        events, lights, durations, on_change = self.__events, self.lights, self.durations, self.on_change
+        while events and events[0][0] <= until:
+            at, index = events[0]
+            light = lights[index]
+            light.change()
+            heapq.heapreplace(events, (at + durations[type(light.state)], index))
+            if on_change is not None:
+                on_change(at, light)
+            processed += 1
+        self.now = until
+        self.__record(processed, started_at)
+        return processed
+
+    async def run_realtime(self, until: float, time_scale: float = 1.0) -> int:
+        loop = asyncio.get_running_loop()
+        started_at, real_start, simulated_start = time.perf_counter(), loop.time(), self.now
+        processed = 0
+        events = self.__events
+        while events and events[0][0] <= until:
+            at, index = events[0]
+            delay = real_start + (at - simulated_start) / time_scale - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            light = self.lights[index]
+            light.change()
+            heapq.heapreplace(events, (at + self.durations[type(light.state)], index))
+            if self.on_change is not None:
+                self.on_change(at, light)
+            processed += 1
+        self.now = until
+        self.__record(processed, started_at)
+        return processed
+
+    def __record(self, processed: int, started_at: float):
+        self.events_processed += processed
+        self.elapsed += time.perf_counter() - started_at
+
+
 if __name__ == "__main__":
     traffic_light: TrafficLight = TrafficLight()
     traffic_light.state = RedTrafficLight()
@@ -89,3 +216,29 @@ if __name__ == "__main__":
         traffic_light.change()
         traffic_light.report_state()
         counter = counter+1
+
+    grid = TrafficLightGrid(1_000_000)
+    grid.change()
+    grid.change(mask=np.arange(len(grid.codes)) % 2 == 0)
+    grid.report_state(0)
+    grid.report_state(1)
+
+    durations = {RedTrafficLight: 30.0, GreenTrafficLight: 25.0, OrangeTrafficLight: 5.0}
+    simulation = TrafficSimulation(durations)
+    for intersection in range(1_000):
+        light = TrafficLight()
+        light.state = RedTrafficLight()
+        simulation.add(light, offset=-(intersection % 60))
+    simulation.run(until=24 * 60 * 60)
+    print(f"Replayed a day of {len(simulation.lights)} lights: {simulation.events_processed} events, "
+          f"{simulation.events_per_second:,.0f} events/s, queue size: {simulation.queue_size}")
+
+    def report_change(at: float, light: TrafficLight):
+        print(f"{at:>5.0f}s", end=' ')
+        light.report_state()
+
+    realtime_simulation = TrafficSimulation(durations, on_change=report_change)
+    realtime_light = TrafficLight()
+    realtime_light.state = RedTrafficLight()
+    realtime_simulation.add(realtime_light)
+    asyncio.run(realtime_simulation.run_realtime(until=120, time_scale=600))
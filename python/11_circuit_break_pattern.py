@@ -4,4 +4,559 @@ Circuit breaker design pattern:
 Circuit breaker is a design pattern used in software development. 
 It is used to detect failures and encapsulates the logic of preventing a failure from constantly recurring, during maintenance, temporary external system failure or unexpected system difficulties.
 
-"""
\ No newline at end of file
+States:
+    - CLOSED: calls go through, the outcome of the last 'window_size' calls is tracked, when enough of them failed
+      (or were slow) the breaker opens.
+    - OPEN: calls fail fast with CircuitBreakerOpenError until 'open_duration' seconds have passed.
+    - HALF_OPEN: at most 'half_open_max_calls' probe calls run at the same time, a failed probe opens the breaker again,
+      'half_open_max_calls' successful probes close it.
+
+"""
+
+import asyncio
+import fcntl
+import functools
+import inspect
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from enum import Enum
+from typing import Dict
+
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+# Enum member lookups are comparatively slow, the hot path compares against these module level aliases.
+_CLOSED, _OPEN, _HALF_OPEN = CircuitState.CLOSED, CircuitState.OPEN, CircuitState.HALF_OPEN
+
+
+class CircuitBreakerOpenError(Exception):
+    pass
+
+
+class SlidingWindow:
+    """
+    Ring buffer with the outcome of the last 'size' calls, one byte per call (bit 0 - failed, bit 1 - slow).
+    Recording a call is O(1) and allocates nothing, the failure and slow call counts are kept up to date.
+    """
+    FAILED, SLOW = 1, 2
+    __slots__ = ('size', 'count', 'failures', 'slow_calls', '_outcomes', '_index')
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._outcomes = bytearray(size)
+        self.reset()
+
+    def reset(self):
+        self._outcomes[:] = bytes(self.size)
+        self._index = 0
+        self.count = 0
+        self.failures = 0
+        self.slow_calls = 0
+
+    def record(self, failed: bool, slow: bool):
+        index = self._index
+        if self.count == self.size:
+            evicted = self._outcomes[index]
+            if evicted:
+                self.failures -= evicted & 1
+                self.slow_calls -= evicted >> 1
+        else:
+            self.count += 1
+        if failed or slow:
+            self._outcomes[index] = failed | (slow << 1)
+            self.failures += failed
+            self.slow_calls += slow
+        else:
+            self._outcomes[index] = 0
+        index += 1
+        self._index = 0 if index == self.size else index
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.count if self.count else 0.0
+
+    @property
+    def slow_call_rate(self) -> float:
+        return self.slow_calls / self.count if self.count else 0.0
+
+
+class CircuitBreaker:
+    """
+    Wraps sync and async callables - breaker.call(func, ...), await breaker.call_async(coroutine_func, ...),
+    or @breaker as a decorator on either.
+    The closed state success path only takes the lock to record the outcome, transitions are counted in 'transitions'
+    as (from state, to state) pairs.
+    """
+
+    def __init__(self, window_size: int = 100, minimum_calls: int = 10, failure_rate_threshold: float = 0.5,
+                 slow_call_duration: float = 1.0, slow_call_rate_threshold: float = 1.0, open_duration: float = 30.0,
+                 half_open_max_calls: int = 3, recorded_exceptions: tuple = (Exception,)) -> None:
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.recorded_exceptions = recorded_exceptions
+        self.state = CircuitState.CLOSED
+        self.transitions: Counter = Counter()
+        self.rejected_calls = 0
+        self._window = SlidingWindow(window_size)
+        self._lock = threading.Lock()
+        self._open_until = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._half_open_generation = 0
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await self.call_async(func, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.call(func, *args, **kwargs)
+        return wrapper
+
+    def call(self, func, *args, **kwargs):
+        permit = self._acquire_permission()
+        started_at = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except self.recorded_exceptions:
+            self._on_result(permit, True, time.perf_counter() - started_at)
+            raise
+        except BaseException:
+            self._release(permit)
+            raise
+        self._on_result(permit, False, time.perf_counter() - started_at)
+        return result
+
+    async def call_async(self, func, *args, **kwargs):
+        permit = self._acquire_permission()
+        started_at = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except (asyncio.CancelledError, *self.recorded_exceptions):
+            # Cancellation is what asyncio.wait_for does to a hung call on timeout, so it counts as a failure.
+            self._on_result(permit, True, time.perf_counter() - started_at)
+            raise
+        except BaseException:
+            self._release(permit)
+            raise
+        self._on_result(permit, False, time.perf_counter() - started_at)
+        return result
+
+    def _acquire_permission(self):
+        """
+        Returns None for a closed state call, or the half open generation of a probe call.
+        Raises CircuitBreakerOpenError when the call is rejected.
+        """
+        if self.state is _CLOSED:
+            return None
+        with self._lock:
+            if self.state is CircuitState.OPEN:
+                if time.monotonic() < self._open_until:
+                    self.rejected_calls += 1
+                    raise CircuitBreakerOpenError("circuit breaker is open")
+                self._transition(CircuitState.HALF_OPEN)
+            if self.state is CircuitState.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_max_calls:
+                    self.rejected_calls += 1
+                    raise CircuitBreakerOpenError("circuit breaker is half open and all probe slots are taken")
+                self._probes_in_flight += 1
+                return self._half_open_generation
+            return None
+
+    def _release(self, permit):
+        """
+        Gives back a probe slot without recording an outcome, for calls interrupted by a non recorded BaseException.
+        """
+        if permit is None:
+            return
+        with self._lock:
+            if self.state is CircuitState.HALF_OPEN and permit == self._half_open_generation:
+                self._probes_in_flight -= 1
+
+    def _on_result(self, permit, failed: bool, duration: float):
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if permit is not None:
+                # Probes started in an earlier half open period say nothing about the current one.
+                if self.state is not CircuitState.HALF_OPEN or permit != self._half_open_generation:
+                    return
+                self._probes_in_flight -= 1
+                if failed or slow:
+                    self._transition(CircuitState.OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_max_calls:
+                        self._transition(CircuitState.CLOSED)
+                return
+            if self.state is not _CLOSED:
+                return
+            window = self._window
+            window.record(failed, slow)
+            # A success can only push the rates over a threshold on the call that reaches minimum_calls.
+            if (failed or slow or window.count == self.minimum_calls) and window.count >= self.minimum_calls and (
+                    window.failures >= window.count * self.failure_rate_threshold
+                    or window.slow_calls >= window.count * self.slow_call_rate_threshold):
+                self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState):
+        self.transitions[(self.state, state)] += 1
+        if state is CircuitState.OPEN:
+            self._open_until = time.monotonic() + self.open_duration
+        elif state is CircuitState.HALF_OPEN:
+            self._half_open_generation += 1
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        else:
+            self._window.reset()
+        self.state = state
+
+
+class SharedBreakerRegistry:
+    """
+    Breaker state shared by all processes on a host through a memory mapped file, e.g. the workers of a pre-fork server.
+    Every endpoint gets a fixed size slot holding its state, open-until time, window counters, ring buffer and
+    transition counters, so a breaker tripped by one process is seen by the next call in every other process.
+
+    Python has no atomic compare and swap on shared memory, so updates take a short exclusive fcntl lock on the
+    endpoint's slot (plus a thread lock, fcntl locks are per process). The closed state check before a call is a
+    plain read from the mapping and takes no lock. time.monotonic() is system wide on Linux, so open-until times
+    compare correctly between processes.
+
+    Half open probes are held as leases of (owner pid, deadline), one per probe slot. A lease whose owner has exited or
+    whose deadline has passed is reclaimed by the next permission check, so a worker dying mid-probe can not keep
+    the breaker half open forever.
+    """
+    _MAGIC = b'CBREG002'
+    _HEADER = struct.Struct('<8sqqq')
+    _NAME_SIZE = 64
+    # state, open_until, count, failures, slow_calls, index, half_open_generation, probe_successes, 4 transition counters
+    _FIELDS = struct.Struct('<qdqqqqqqqqqq')
+    _LEASE = struct.Struct('<qd')
+    _TRANSITIONS = ((_CLOSED, _OPEN), (_OPEN, _HALF_OPEN), (_HALF_OPEN, _CLOSED), (_HALF_OPEN, _OPEN))
+
+    def __init__(self, file_path: str, slots: int = 64, window_size: int = 100, **breaker_options) -> None:
+        self.window_size = window_size
+        self.breaker_options = breaker_options
+        self.probe_slots = breaker_options.get('half_open_max_calls', 3)
+        self.slot_size = (self._NAME_SIZE + self._FIELDS.size + self.probe_slots * self._LEASE.size + window_size + 7) // 8 * 8
+        self.__breakers: Dict[str, SharedCircuitBreaker] = {}
+        self.__lock = threading.Lock()
+        self.__fd = os.open(file_path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self.__locked(0, self._HEADER.size):
+            if os.fstat(self.__fd).st_size == 0:
+                os.ftruncate(self.__fd, self._HEADER.size + slots * self.slot_size)
+                os.pwrite(self.__fd, self._HEADER.pack(self._MAGIC, slots, window_size, self.probe_slots), 0)
+            self.mapping = mmap.mmap(self.__fd, 0)
+        magic, self.slots, stored_window_size, stored_probe_slots = self._HEADER.unpack_from(self.mapping, 0)
+        if magic != self._MAGIC or stored_window_size != window_size or stored_probe_slots != self.probe_slots:
+            raise ValueError(f"{file_path} is not a breaker registry with window_size {window_size} "
+                             f"and half_open_max_calls {self.probe_slots}")
+
+    def breaker(self, endpoint: str) -> 'SharedCircuitBreaker':
+        with self.__lock:
+            if endpoint not in self.__breakers:
+                self.__breakers[endpoint] = SharedCircuitBreaker(self, self.__slot_offset(endpoint), **self.breaker_options)
+            return self.__breakers[endpoint]
+
+    def close(self):
+        self.mapping.close()
+        os.close(self.__fd)
+
+    @contextmanager
+    def locked_slot(self, offset: int):
+        with self.__lock, self.__locked(offset, self.slot_size):
+            yield
+
+    @contextmanager
+    def __locked(self, offset: int, length: int):
+        fcntl.lockf(self.__fd, fcntl.LOCK_EX, length, offset)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self.__fd, fcntl.LOCK_UN, length, offset)
+
+    def __slot_offset(self, endpoint: str) -> int:
+        name = endpoint.encode()
+        if not name or len(name) > self._NAME_SIZE:
+            raise ValueError(f"endpoint name must be 1 to {self._NAME_SIZE} bytes")
+        name = name.ljust(self._NAME_SIZE, b'\0')
+        with self.__locked(0, self._HEADER.size):
+            for slot in range(self.slots):
+                offset = self._HEADER.size + slot * self.slot_size
+                stored = self.mapping[offset:offset + self._NAME_SIZE]
+                if stored == name:
+                    return offset
+                if stored == bytes(self._NAME_SIZE):
+                    self.mapping[offset:offset + self._NAME_SIZE] = name
+                    return offset
+        raise ValueError(f"all {self.slots} registry slots are taken")
+
+
+class SharedCircuitBreaker(CircuitBreaker):
+    """
+    CircuitBreaker whose state lives in a SharedBreakerRegistry slot instead of the process, create it through
+    registry.breaker(endpoint). Same thresholds and state machine as CircuitBreaker, a probe lease expires after
+    'probe_lease_duration' seconds.
+    """
+    _STATES = (_CLOSED, _OPEN, _HALF_OPEN)
+    _STATE_CODES = {state: code for code, state in enumerate(_STATES)}
+
+    def __init__(self, registry: SharedBreakerRegistry, offset: int, minimum_calls: int = 10,
+                 failure_rate_threshold: float = 0.5, slow_call_duration: float = 1.0, slow_call_rate_threshold: float = 1.0,
+                 open_duration: float = 30.0, half_open_max_calls: int = 3, recorded_exceptions: tuple = (Exception,),
+                 probe_lease_duration: float = 60.0) -> None:
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.recorded_exceptions = recorded_exceptions
+        self.probe_lease_duration = probe_lease_duration
+        self.rejected_calls = 0
+        self._registry = registry
+        self._mapping = registry.mapping
+        self._fields_offset = offset + SharedBreakerRegistry._NAME_SIZE
+        self._leases_offset = self._fields_offset + SharedBreakerRegistry._FIELDS.size
+        self._outcomes_offset = self._leases_offset + half_open_max_calls * SharedBreakerRegistry._LEASE.size
+        self._window_size = registry.window_size
+        self._slot_offset = offset
+
+    @property
+    def state(self) -> CircuitState:
+        return self._STATES[struct.unpack_from('<q', self._mapping, self._fields_offset)[0]]
+
+    @property
+    def transitions(self) -> Counter:
+        counters = SharedBreakerRegistry._FIELDS.unpack_from(self._mapping, self._fields_offset)[8:]
+        return Counter({transition: count for transition, count in zip(SharedBreakerRegistry._TRANSITIONS, counters) if count})
+
+    def _acquire_permission(self):
+        """
+        Returns None for a closed state call, or a (half open generation, lease slot, lease deadline) permit for a probe.
+        """
+        if struct.unpack_from('<q', self._mapping, self._fields_offset)[0] == 0:
+            return None
+        with self._registry.locked_slot(self._slot_offset):
+            fields = list(SharedBreakerRegistry._FIELDS.unpack_from(self._mapping, self._fields_offset))
+            try:
+                if fields[0] == 1:
+                    if time.monotonic() < fields[1]:
+                        self.rejected_calls += 1
+                        raise CircuitBreakerOpenError("circuit breaker is open")
+                    self.__transition(fields, _HALF_OPEN)
+                if fields[0] == 2:
+                    lease_slot = self.__free_lease_slot()
+                    if lease_slot is None:
+                        self.rejected_calls += 1
+                        raise CircuitBreakerOpenError("circuit breaker is half open and all probe slots are taken")
+                    deadline = time.monotonic() + self.probe_lease_duration
+                    self.__write_lease(lease_slot, os.getpid(), deadline)
+                    return fields[6], lease_slot, deadline
+                return None
+            finally:
+                SharedBreakerRegistry._FIELDS.pack_into(self._mapping, self._fields_offset, *fields)
+
+    def _release(self, permit):
+        if permit is None:
+            return
+        with self._registry.locked_slot(self._slot_offset):
+            fields = SharedBreakerRegistry._FIELDS.unpack_from(self._mapping, self._fields_offset)
+            self.__end_lease(fields, permit)
+
+    def _on_result(self, permit, failed: bool, duration: float):
+        slow = duration >= self.slow_call_duration
+        with self._registry.locked_slot(self._slot_offset):
+            fields = list(SharedBreakerRegistry._FIELDS.unpack_from(self._mapping, self._fields_offset))
+            if permit is not None:
+                # A probe whose lease was reclaimed, or that started in an earlier half open period, is dropped.
+                if not self.__end_lease(fields, permit):
+                    return
+                if failed or slow:
+                    self.__transition(fields, _OPEN)
+                else:
+                    fields[7] += 1
+                    if fields[7] >= self.half_open_max_calls:
+                        self.__transition(fields, _CLOSED)
+            elif fields[0] == 0:
+                self.__record(fields, failed, slow)
+                count, failures, slow_calls = fields[2], fields[3], fields[4]
+                if count >= self.minimum_calls and (failures >= count * self.failure_rate_threshold
+                                                    or slow_calls >= count * self.slow_call_rate_threshold):
+                    self.__transition(fields, _OPEN)
+            SharedBreakerRegistry._FIELDS.pack_into(self._mapping, self._fields_offset, *fields)
+
+    def __end_lease(self, fields, permit) -> bool:
+        """
+        Frees the permit's lease, returns False when the permit no longer holds it.
+        """
+        generation, lease_slot, deadline = permit
+        if fields[0] != 2 or fields[6] != generation:
+            return False
+        pid, stored_deadline = SharedBreakerRegistry._LEASE.unpack_from(self._mapping, self.__lease_offset(lease_slot))
+        if pid != os.getpid() or stored_deadline != deadline:
+            return False
+        self.__write_lease(lease_slot, 0, 0.0)
+        return True
+
+    def __free_lease_slot(self):
+        now = time.monotonic()
+        for lease_slot in range(self.half_open_max_calls):
+            pid, deadline = SharedBreakerRegistry._LEASE.unpack_from(self._mapping, self.__lease_offset(lease_slot))
+            if pid == 0 or deadline <= now or not _process_alive(pid):
+                return lease_slot
+        return None
+
+    def __lease_offset(self, lease_slot: int) -> int:
+        return self._leases_offset + lease_slot * SharedBreakerRegistry._LEASE.size
+
+    def __write_lease(self, lease_slot: int, pid: int, deadline: float):
+        SharedBreakerRegistry._LEASE.pack_into(self._mapping, self.__lease_offset(lease_slot), pid, deadline)
+
+    def __record(self, fields: list, failed: bool, slow: bool):
+        outcome_offset = self._outcomes_offset + fields[5]
+        if fields[2] == self._window_size:
+            evicted = self._mapping[outcome_offset]
+            fields[3] -= evicted & 1
+            fields[4] -= evicted >> 1
+        else:
+            fields[2] += 1
+        self._mapping[outcome_offset] = failed | (slow << 1)
+        fields[3] += failed
+        fields[4] += slow
+        fields[5] = (fields[5] + 1) % self._window_size
+
+    def __transition(self, fields: list, state: CircuitState):
+        fields[8 + SharedBreakerRegistry._TRANSITIONS.index((self._STATES[fields[0]], state))] += 1
+        if state is _OPEN:
+            fields[1] = time.monotonic() + self.open_duration
+        elif state is _HALF_OPEN:
+            fields[6] += 1
+            fields[7] = 0
+            leases_size = self.half_open_max_calls * SharedBreakerRegistry._LEASE.size
+            self._mapping[self._leases_offset:self._leases_offset + leases_size] = bytes(leases_size)
+        else:
+            fields[2:6] = [0, 0, 0, 0]
+            self._mapping[self._outcomes_offset:self._outcomes_offset + self._window_size] = bytes(self._window_size)
+        fields[0] = self._STATE_CODES[state]
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _shared_breaker_worker(file_path: str, endpoint: str, tripped, results):
+    registry = SharedBreakerRegistry(file_path, window_size=10, minimum_calls=5, open_duration=60)
+    breaker = registry.breaker(endpoint)
+    tripped.wait()
+    try:
+        breaker.call(lambda: "called")
+        results.put(f"process {os.getpid()}: call went through")
+    except CircuitBreakerOpenError as error:
+        results.put(f"process {os.getpid()}: {error}")
+    registry.close()
+
+
+def demo_shared_breaker(workers: int = 4):
+    with tempfile.TemporaryDirectory() as directory_path:
+        file_path = os.path.join(directory_path, 'breakers.mmap')
+        registry = SharedBreakerRegistry(file_path, window_size=10, minimum_calls=5, open_duration=60)
+        tripped, results = multiprocessing.Event(), multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_shared_breaker_worker, args=(file_path, "payments", tripped, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        def failing_call():
+            raise ConnectionError("payments unavailable")
+
+        breaker = registry.breaker("payments")
+        for _ in range(5):
+            try:
+                breaker.call(failing_call)
+            except ConnectionError:
+                pass
+        print(f"Parent process {os.getpid()} tripped the shared breaker: {breaker.state}")
+        tripped.set()
+        for _ in processes:
+            print(results.get(timeout=10))
+        for process in processes:
+            process.join()
+        registry.close()
+
+
+def benchmark_breaker_overhead(calls: int = 1_000_000):
+    def operation(value):
+        return value
+
+    breaker = CircuitBreaker()
+    start = time.perf_counter()
+    for value in range(calls):
+        operation(value)
+    plain_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for value in range(calls):
+        breaker.call(operation, value)
+    breaker_time = time.perf_counter() - start
+    print(f"{calls} calls - plain: {plain_time * 1e9 / calls:.0f} ns/call, "
+          f"through breaker: {breaker_time * 1e9 / calls:.0f} ns/call, overhead: {(breaker_time - plain_time) * 1e9 / calls:.0f} ns/call")
+
+
+if __name__ == "__main__":
+    breaker = CircuitBreaker(window_size=10, minimum_calls=5, open_duration=0.1, half_open_max_calls=2)
+
+    @breaker
+    def flaky_service(fail: bool):
+        if fail:
+            raise ConnectionError("service unavailable")
+        return "ok"
+
+    for _ in range(5):
+        try:
+            flaky_service(True)
+        except ConnectionError:
+            pass
+    try:
+        flaky_service(False)
+    except CircuitBreakerOpenError as error:
+        print(f"Rejected: {error}")
+
+    time.sleep(0.1)
+
+    @breaker
+    async def async_service():
+        return "ok"
+
+    print(flaky_service(False), asyncio.run(async_service()), breaker.state)
+    print({f"{from_state.value} -> {to_state.value}": count for (from_state, to_state), count in breaker.transitions.items()})
+
+    demo_shared_breaker()
+
+    if "--benchmark" in sys.argv:
+        benchmark_breaker_overhead()
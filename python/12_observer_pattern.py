@@ -15,14 +15,25 @@ So, if we start creating domains we should create a class that adds, deletes, or
 
 """
 
+import gc
+import threading
+import time
+import weakref
 from abc import ABC, abstractmethod
-from typing import List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterable, List
 
 class IObserver(ABC):
     @abstractmethod
     def update(self, youtuber_name: str, video_name: str):
         pass
 
+    # Optional, NotificationDispatcher delivers a burst of uploads of one channel with a single call.
+    def update_batch(self, youtuber_name: str, video_names: List[str]):
+        for video_name in video_names:
+            self.update(youtuber_name, video_name)
+
 class ISubject:
 
     @abstractmethod
@@ -59,6 +70,208 @@ class Youtuber(ISubject):
             for subscriber in self.subscribers:
                 subscriber.update(self.youtuber_name, video_name)
 
+class _StrongReference:
+    """
+    Same call interface as weakref.ref, for subscribers the subject must keep alive.
+    """
+    __slots__ = ('observer',)
+
+    def __init__(self, observer: IObserver) -> None:
+        self.observer = observer
+
+    def __call__(self) -> IObserver:
+        return self.observer
+
+
+class _Mailbox:
+    __slots__ = ('observer', 'pending')
+
+    def __init__(self, observer: IObserver) -> None:
+        self.observer = observer
+        self.pending: List[tuple] = []
+
+
+class NotificationDispatcher:
+    """
+    Delivers notifications on a thread pool, so a slow subscriber does not stall upload_video.
+    Every subscriber has a mailbox of at most 'queue_size' pending notifications, when it is full the new notification
+    is dropped (when_full='drop') or the uploader waits for room (when_full='block').
+    A worker drains a whole mailbox at once and calls update_batch once per channel, which coalesces bursts of uploads.
+    queue_depth, dropped, delivered and the recent delivery lags (seconds from dispatch to update) are exposed as metrics.
+    """
+    DROP, BLOCK = 'drop', 'block'
+
+    def __init__(self, max_workers: int = 8, queue_size: int = 100, when_full: str = DROP, lag_history: int = 10000) -> None:
+        if when_full not in (self.DROP, self.BLOCK):
+            raise ValueError(f"when_full must be '{self.DROP}' or '{self.BLOCK}'")
+        self.queue_size = queue_size
+        self.when_full = when_full
+        self.queue_depth = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        self.max_lag = 0.0
+        self.lags = deque(maxlen=lag_history)
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__condition = threading.Condition()
+        # A mailbox exists while its subscriber has notifications pending or being delivered.
+        self.__mailboxes: Dict[int, _Mailbox] = {}
+
+    def dispatch(self, observer: IObserver, youtuber_name: str, video_name: str):
+        key = id(observer)
+        with self.__condition:
+            while True:
+                mailbox = self.__mailboxes.get(key)
+                if mailbox is None or len(mailbox.pending) < self.queue_size:
+                    break
+                if self.when_full == self.DROP:
+                    self.dropped += 1
+                    return
+                self.__condition.wait()
+            schedule = mailbox is None
+            if schedule:
+                mailbox = self.__mailboxes[key] = _Mailbox(observer)
+            mailbox.pending.append((youtuber_name, video_name, time.perf_counter()))
+            self.queue_depth += 1
+        if schedule:
+            self.__executor.submit(self.__deliver, key)
+
+    def join(self):
+        """
+        Waits until every dispatched notification has been delivered.
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: not self.__mailboxes)
+
+    def shutdown(self):
+        self.join()
+        self.__executor.shutdown()
+
+    def __deliver(self, key: int):
+        while True:
+            with self.__condition:
+                mailbox = self.__mailboxes[key]
+                pending, mailbox.pending = mailbox.pending, []
+                if not pending:
+                    del self.__mailboxes[key]
+                    self.__condition.notify_all()
+                    return
+                self.queue_depth -= len(pending)
+                self.__condition.notify_all()
+
+            video_names: Dict[str, List[str]] = {}
+            for youtuber_name, video_name, _ in pending:
+                video_names.setdefault(youtuber_name, []).append(video_name)
+            try:
+                for youtuber_name, names in video_names.items():
+                    mailbox.observer.update_batch(youtuber_name, names)
+            except Exception:
+                with self.__condition:
+                    self.failed += len(pending)
+                continue
+            delivered_at = time.perf_counter()
+            with self.__condition:
+                self.delivered += len(pending)
+                for _, _, dispatched_at in pending:
+                    lag = delivered_at - dispatched_at
+                    self.lags.append(lag)
+                    if lag > self.max_lag:
+                        self.max_lag = lag
+
+
+class ScalableYoutuber(ISubject):
+    """
+    Youtuber for very large, churning subscriber lists.
+        - subscribers are kept in a dict keyed by id(observer), so subscribe/un_subscribe are O(1) and order is kept,
+        - with weak=True (the default) the channel only holds a weak reference and a garbage collected subscriber
+          drops out on its own,
+        - notify_observers walks a snapshot, so observers may subscribe or unsubscribe (any observer) from update();
+          an observer removed during a notification is not called for it, one added is called from the next one,
+        - with a NotificationDispatcher, update() runs on the dispatcher's workers instead of inside upload_video,
+        - subscribers can register interest tags (e.g. 'category:tech', 'lang:en'), an inverted index from tag to
+          subscribers means an upload only touches the subscribers of its tags plus those without tags,
+          an optional predicate(video_name, tags) then filters the touched subscribers.
+    """
+
+    def __init__(self, youtuber_name: str, dispatcher: NotificationDispatcher = None) -> None:
+        self.youtuber_name = youtuber_name
+        self.dispatcher = dispatcher
+        self.__subscribers: Dict[int, Callable[[], IObserver]] = {}
+        # Subscribers without tags get every video, the others are found through their tags.
+        self.__untagged: Dict[int, None] = {}
+        self.__by_tag: Dict[str, Dict[int, None]] = {}
+        self.__tags: Dict[int, FrozenSet[str]] = {}
+        self.__predicates: Dict[int, Callable[[str, FrozenSet[str]], bool]] = {}
+
+    def __len__(self):
+        return len(self.__subscribers)
+
+    def subscribe(self, observer: IObserver, weak: bool = True, tags: Iterable[str] = None,
+                  predicate: Callable[[str, FrozenSet[str]], bool] = None):
+        key = id(observer)
+        if key in self.__subscribers and self.__subscribers[key]() is observer:
+            return
+
+        def drop(reference):
+            if self.__subscribers.get(key) is reference:
+                self.__remove(key)
+
+        self.__subscribers[key] = weakref.ref(observer, drop) if weak else _StrongReference(observer)
+        tags = frozenset(tags or ())
+        if tags:
+            self.__tags[key] = tags
+            for tag in tags:
+                self.__by_tag.setdefault(tag, {})[key] = None
+        else:
+            self.__untagged[key] = None
+        if predicate is not None:
+            self.__predicates[key] = predicate
+
+    def un_subscribe(self, observer: IObserver):
+        reference = self.__subscribers.get(id(observer))
+        if reference is None or reference() is not observer:
+            raise ValueError(f"{observer} is not subscribed to {self.youtuber_name}")
+        self.__remove(id(observer))
+
+    def upload_video(self, video_name, tags: Iterable[str] = None):
+        print(f"{self.youtuber_name} uploaded video named: {video_name}")
+        self.notify_observers(video_name, tags)
+
+    def notify_observers(self, video_name: str, tags: Iterable[str] = None):
+        tags = frozenset(tags or ())
+        keys = list(self.__untagged)
+        for tag in tags:
+            keys.extend(self.__by_tag.get(tag, ()))
+        if len(tags) > 1:
+            keys = list(dict.fromkeys(keys))
+
+        subscribers, predicates = self.__subscribers, self.__predicates
+        targets = [(key, subscribers.get(key)) for key in keys]
+        for key, reference in targets:
+            if reference is None or subscribers.get(key) is not reference:
+                continue
+            observer = reference()
+            if observer is None:
+                continue
+            predicate = predicates.get(key)
+            if predicate is not None and not predicate(video_name, tags):
+                continue
+            if self.dispatcher is None:
+                observer.update(self.youtuber_name, video_name)
+            else:
+                self.dispatcher.dispatch(observer, self.youtuber_name, video_name)
+
+    def __remove(self, key: int):
+        del self.__subscribers[key]
+        self.__untagged.pop(key, None)
+        self.__predicates.pop(key, None)
+        for tag in self.__tags.pop(key, ()):
+            subscribers = self.__by_tag[tag]
+            del subscribers[key]
+            if not subscribers:
+                del self.__by_tag[tag]
+
+
 class Subscriber(IObserver):
     def __init__(self, subscriber_name) -> None:
         self.subscriber_name = subscriber_name
@@ -88,6 +301,29 @@ if __name__ == "__main__":
     t_series_youtuber.upload_video("New Bollywood movies")
     t_series_youtuber.upload_video("New Tollyhood movies")
 
+    # Weakly referenced subscribers
+    design_patterns_youtuber: ScalableYoutuber = ScalableYoutuber("Design Patterns Channel")
+    design_patterns_youtuber.subscribe(max)
+    design_patterns_youtuber.subscribe(jack, weak=False)
+    design_patterns_youtuber.subscribe(Subscriber('Temporary'))
+    gc.collect()
+    print(f"{design_patterns_youtuber.youtuber_name} has {len(design_patterns_youtuber)} subscribers")
+    design_patterns_youtuber.upload_video("Observer pattern")
 
+    # Delivering notifications on a thread pool, bursts are coalesced per subscriber
+    dispatcher = NotificationDispatcher(max_workers=2, queue_size=10, when_full=NotificationDispatcher.DROP)
+    design_patterns_youtuber.dispatcher = dispatcher
+    for part in range(1, 4):
+        design_patterns_youtuber.upload_video(f"Design patterns part {part}")
+    dispatcher.shutdown()
+    print(f"delivered: {dispatcher.delivered}, dropped: {dispatcher.dropped}, queue depth: {dispatcher.queue_depth}, "
+          f"max lag: {dispatcher.max_lag * 1000:.2f} ms")
 
-
+    # Interest filtered subscribers
+    design_patterns_youtuber.dispatcher = None
+    tech_subscriber = Subscriber('Tech fan')
+    design_patterns_youtuber.subscribe(tech_subscriber, tags=['category:tech'])
+    design_patterns_youtuber.subscribe(Subscriber('Telugu tech fan'), weak=False, tags=['category:tech'],
+                                       predicate=lambda video_name, tags: 'lang:te' in tags)
+    design_patterns_youtuber.upload_video("Singleton pattern", tags=['category:tech', 'lang:en'])
+    design_patterns_youtuber.upload_video("Singleton pattern - Telugu", tags=['category:tech', 'lang:te'])
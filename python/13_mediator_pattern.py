@@ -0,0 +1,198 @@
+"""
+Mediator Design Pattern:
+------------------------
+The mediator pattern defines an object that encapsulates how a set of objects (colleagues) interact.
+Colleagues do not refer to each other explicitly, they only talk to the mediator, which promotes loose coupling and
+lets their interaction vary independently.
+
+Realtime Analogy:
+-----------------
+An air traffic control tower. Aircraft do not talk to each other to decide who lands first,
+every aircraft talks to the tower and the tower routes the information to the aircraft that need it.
+
+Here the mediator keeps a routing table keyed by message type:
+    - a route's handler tuple is replaced when a handler registers, so sending a message is one dict lookup with no
+      handler scan,
+    - payloads are handed to the handlers as a memoryview over the sender's bytes, nothing is copied,
+    - every route counts its messages and the time spent in its handlers.
+"""
+
+import asyncio
+import inspect
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Tuple, Union
+
+Payload = Union[bytes, bytearray, memoryview]
+
+
+class Route:
+    __slots__ = ('handlers', 'async_handlers', 'messages', 'total_latency', 'max_latency', 'first_sent_at', 'last_sent_at')
+
+    def __init__(self, handlers: Tuple[Callable, ...] = (), async_handlers: Tuple[Callable, ...] = ()) -> None:
+        self.handlers = handlers
+        self.async_handlers = async_handlers
+        self.messages = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.first_sent_at = None
+        self.last_sent_at = None
+
+    @property
+    def mean_latency(self) -> float:
+        return self.total_latency / self.messages if self.messages else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """
+        Messages per second between the first and the last message on this route.
+        """
+        if self.messages < 2 or self.last_sent_at == self.first_sent_at:
+            return 0.0
+        return self.messages / (self.last_sent_at - self.first_sent_at)
+
+    def record(self, started_at: float, finished_at: float):
+        latency = finished_at - started_at
+        self.messages += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+        if self.first_sent_at is None:
+            self.first_sent_at = started_at
+        self.last_sent_at = finished_at
+
+
+class IMediator(ABC):
+
+    @abstractmethod
+    def register(self, message_type: str, handler: Callable[[memoryview], object]):
+        pass
+
+    @abstractmethod
+    def send(self, message_type: str, payload: Payload):
+        pass
+
+
+class Mediator(IMediator):
+    """
+    Coroutine function handlers are only called by send_async, plain handlers are called by both send and send_async.
+    send raises TypeError for a message type that has coroutine function handlers, rather than skipping them.
+    """
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, Route] = {}
+
+    def register(self, message_type: str, handler: Callable[[memoryview], object]):
+        route = self.routes.get(message_type)
+        if route is None:
+            route = self.routes[message_type] = Route()
+        # The route, and so its counters, stays the same, only the handler tuple is swapped. A send that is already
+        # iterating the old tuple finishes on it and still records into the route.
+        if inspect.iscoroutinefunction(handler):
+            route.async_handlers = route.async_handlers + (handler,)
+        else:
+            route.handlers = route.handlers + (handler,)
+
+    def send(self, message_type: str, payload: Payload) -> int:
+        """
+        Returns the number of handlers the message was delivered to.
+        """
+        route = self.routes.get(message_type)
+        if route is None:
+            return 0
+        if route.async_handlers:
+            raise TypeError(f"'{message_type}' has coroutine function handlers, send it with send_async")
+        handlers = route.handlers
+        view = payload if isinstance(payload, memoryview) else memoryview(payload)
+        started_at = time.perf_counter()
+        for handler in handlers:
+            handler(view)
+        route.record(started_at, time.perf_counter())
+        return len(handlers)
+
+    async def send_async(self, message_type: str, payload: Payload) -> int:
+        route = self.routes.get(message_type)
+        if route is None:
+            return 0
+        handlers, async_handlers = route.handlers, route.async_handlers
+        view = payload if isinstance(payload, memoryview) else memoryview(payload)
+        started_at = time.perf_counter()
+        for handler in handlers:
+            handler(view)
+        if async_handlers:
+            await asyncio.gather(*(handler(view) for handler in async_handlers))
+        route.record(started_at, time.perf_counter())
+        return len(handlers) + len(async_handlers)
+
+
+class IColleague(ABC):
+
+    def __init__(self, mediator: IMediator) -> None:
+        self.mediator = mediator
+
+    def send(self, message_type: str, payload: Payload):
+        return self.mediator.send(message_type, payload)
+
+    @abstractmethod
+    def receive(self, payload: memoryview):
+        pass
+
+
+class Aircraft(IColleague):
+
+    def __init__(self, mediator: IMediator, call_sign: str) -> None:
+        super().__init__(mediator)
+        self.call_sign = call_sign
+        mediator.register('runway_status', self.receive)
+
+    def request_landing(self):
+        self.send('landing_request', self.call_sign.encode())
+
+    def receive(self, payload: memoryview):
+        print(f"{self.call_sign} received runway status: {bytes(payload).decode()}")
+
+
+class ControlTower(IColleague):
+
+    def __init__(self, mediator: IMediator) -> None:
+        super().__init__(mediator)
+        mediator.register('landing_request', self.receive)
+
+    def receive(self, payload: memoryview):
+        self.send('runway_status', b'runway 1 cleared for ' + payload)
+
+
+def benchmark_mediator(messages: int = 100_000):
+    payload = bytes(256)
+    for handlers_per_type in (1, 10, 100):
+        mediator = Mediator()
+        for _ in range(handlers_per_type):
+            mediator.register('event', len)
+        count = messages // handlers_per_type
+        start = time.perf_counter()
+        for _ in range(count):
+            mediator.send('event', payload)
+        elapsed = time.perf_counter() - start
+        route = mediator.routes['event']
+        print(f"{handlers_per_type:>3} handlers per type: {count / elapsed:,.0f} messages/s, "
+              f"{count * handlers_per_type / elapsed:,.0f} deliveries/s, mean latency: {route.mean_latency * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    mediator = Mediator()
+    tower = ControlTower(mediator)
+    aircraft = [Aircraft(mediator, call_sign) for call_sign in ('AI-101', 'BA-202')]
+    aircraft[0].request_landing()
+
+    async def log_runway_status(payload: memoryview):
+        await asyncio.sleep(0)
+        print(f"async logger: {bytes(payload).decode()}")
+
+    mediator.register('runway_status', log_runway_status)
+    asyncio.run(mediator.send_async('runway_status', b'runway 2 closed'))
+    for message_type, route in mediator.routes.items():
+        print(f"{message_type}: {route.messages} messages, mean latency: {route.mean_latency * 1e6:.1f} us")
+
+    if "--benchmark" in sys.argv:
+        benchmark_mediator()